@@ -43,19 +43,94 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database: comma-separated hosts, or file names
+# for SQLite. Reads of safe-method requests are routed to them.
+DATABASE_REPLICAS = [
+    replica for replica in os.environ.get('DATABASE_REPLICAS', '').split(',')
+    if replica
+]
+for number, replica in enumerate(DATABASE_REPLICAS, start=1):
+    DATABASES[f'replica{number}'] = dict(
+        DATABASES['default'],
+        **(
+            {'NAME': replica}
+            if 'sqlite' in (DATABASES['default']['ENGINE'] or '')
+            else {'HOST': replica}
+        ),
+        TEST={'MIRROR': 'default'}
+    )
+DATABASE_ROUTERS = ['services.routers.ReplicaRouter']
+
+# A client is pinned to the primary database for this long after a write,
+# so it reads its own writes.
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+# A replica lagging behind the primary more than this is not read from.
+REPLICA_MAX_LAG_SECONDS = int(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_CHECK_INTERVAL = 5
+
+# Authentication by database tokens ('token') or by signed short-lived
+# access tokens with refresh tokens ('jwt'), which still accepts database
+# tokens issued before the switch.
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'token')
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        ('services.authentication.StatelessTokenAuthentication',)
+        if AUTH_TOKEN_MODE == 'jwt' else ()
+    ) + (
         'rest_framework.authentication.TokenAuthentication',
     ),
 
+    'DEFAULT_RENDERER_CLASSES': (
+        'services.renderers.ORJSONRenderer',
+        'services.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+
+    'DEFAULT_THROTTLE_CLASSES': (
+        'services.throttling.UserTokenBucketThrottle',
+        'services.throttling.AnonTokenBucketThrottle',
+        'services.throttling.ScopedTokenBucketThrottle',
+    ),
+
+    'DEFAULT_THROTTLE_RATES': {
+        'user': '600/min',
+        'anon': '300/min',
+        'download': '10/min',
+        'login': '10/min',
+        'set_password': '5/min',
+        'recipe_write': '30/min',
+    },
+    # Anonymous clients are throttled by the address, which the proxies in
+    # front of the app (nginx) append to X-Forwarded-For: the last of them
+    # is trusted, the rest of the header is sent by the client.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
+
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
 
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(
+        os.environ.get('ACCESS_TOKEN_LIFETIME_MINUTES', 5)
+    )),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=int(
+        os.environ.get('REFRESH_TOKEN_LIFETIME_DAYS', 7)
+    )),
+    # The same header as of database tokens, so clients need no changes.
+    'AUTH_HEADER_TYPES': ('Token', 'Bearer'),
+}
+
+# Throttle buckets are kept in process memory ('local')
+# or in the cache ('cache'). Buckets are shared between processes only with
+# a shared CACHE_BACKEND (e.g. Redis or Memcached), the default LocMemCache
+# is per process, like 'local'.
+THROTTLE_STORE = os.environ.get('THROTTLE_STORE', 'cache')
+
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
 MEDIA_URL = '/media/'
@@ -67,6 +142,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'services.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -110,3 +186,52 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
 ]
+
+# Background tasks are run in a thread pool after the transaction commits.
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', 4))
+
+# Recipes of authors with more followers than this are not fanned out
+# into follower timelines, but pulled into a feed at read time.
+FEED_FANOUT_FOLLOWERS_LIMIT = int(
+    os.environ.get('FEED_FANOUT_FOLLOWERS_LIMIT', 5000)
+)
+FEED_BACKFILL_RECIPES = 50
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Anonymous recipe responses are cached per content version.
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+# Favorites and shopping carts do not change the content version, so
+# trending responses are cached only shortly.
+TRENDING_RESPONSE_CACHE_TIMEOUT = 30
+
+# User-independent part of a recipe representation is cached per recipe.
+RECIPE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# The ingredient catalog snapshot is regenerated after an ingredient is
+# changed, and at least this often, to pick up bulk changes without signals.
+INGREDIENT_SNAPSHOT_TIMEOUT = 60 * 60
+
+# Identical concurrent computations wait for the first one this long,
+# within a process, and across processes through the cache if shared.
+SINGLE_FLIGHT_TIMEOUT = 5
+SINGLE_FLIGHT_SHARED = bool(int(os.environ.get('SINGLE_FLIGHT_SHARED', 0)))
+
+# Changes older than this are compacted to the last change of every object.
+CHANGE_LOG_RETENTION_DAYS = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 7))
+# Changes are served once they are this old, so transactions, which inserted
+# an earlier change, have committed.
+CHANGE_LOG_SETTLE_SECONDS = 2
+
+# Recipe images uploaded as a binary body are limited to this size.
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.environ.get('IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+)
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# In-process recipe indexes are built once the server starts,
+# not on the first request.
+from services.indexes import recipe_index  # noqa: E402
+
+recipe_index.start()
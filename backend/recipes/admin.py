@@ -1,12 +1,17 @@
 from recipes.models import (
     Recipe, Ingredient, Tag, RecipeIngredient, RecipeTag
 )
+from users.models import UserRecipe
+from services.pagination import EstimatedCountPaginator
 
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = Recipe.ingredients.through
+    autocomplete_fields = ('ingredient',)
 
     extra = 1
     max_num = 1
@@ -14,24 +19,48 @@ class RecipeIngredientInline(admin.TabularInline):
 
 class RecipeTagInline(admin.TabularInline):
     model = Recipe.tags.through
+    autocomplete_fields = ('tag',)
 
     extra = 1
     max_num = 1
 
 
 class RecipeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'author', 'total_favorites')
+    list_select_related = ('author',)
     search_fields = ('name',)
     readonly_fields=('total_favorites',)
     list_filter = ('tags',)
+    autocomplete_fields = ('author',)
     inlines = (RecipeIngredientInline, RecipeTagInline)
-
-    @admin.display(empty_value='---empty---')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # A subquery instead of Count('userrecipe'), which would be
+        # multiplied by the join of the tags filter.
+        favorites = (
+            UserRecipe.objects
+            .filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(count=Count('id'))
+            .values('count')
+        )
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(
+                Subquery(favorites, output_field=IntegerField()), 0
+            )
+        )
+
+    @admin.display(empty_value='---empty---', ordering='favorites_count')
     def total_favorites(self, obj):
-        return obj.userrecipe_set.all().count()
+        return obj.favorites_count
 
 
 class IngredientAdmin(admin.ModelAdmin):
-    search_fields = ('name',)
+    # Prefix search, the same as in the ingredient API.
+    search_fields = ('^name',)
     list_filter = ('measurement_unit',)
 
 
@@ -41,11 +70,21 @@ class TagAdmin(admin.ModelAdmin):
 
 
 class RecipeIngredientAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
     search_fields = ('recipe__name',)
+    autocomplete_fields = ('recipe', 'ingredient')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class RecipeTagAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipe', 'tag')
+    list_select_related = ('recipe', 'tag')
     search_fields = ('recipe__name',)
+    autocomplete_fields = ('recipe', 'tag')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Recipe, RecipeAdmin)
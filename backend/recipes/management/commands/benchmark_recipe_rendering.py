@@ -0,0 +1,112 @@
+from recipes.models import Recipe
+from recipes.serializers import RecipeSerializer
+from services.functions import prefetch_recipe_queryset
+from services.rows import render_recipe_rows
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+import time
+import tracemalloc
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Compares CPU time and memory per recipe list page of '
+            'RecipeSerializer and the model-free row rendering path.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=settings.REST_FRAMEWORK['PAGE_SIZE']
+        )
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Id of a user to render the pages for, anonymous by default.'
+        )
+        parser.add_argument(
+            '--compact',
+            action='store_true',
+            help='Render the compact list fields instead of all fields.'
+        )
+
+    def get_request(self, user_id: int) -> Request:
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = (
+            User.objects.get(id=user_id) if user_id else AnonymousUser()
+        )
+        return request
+
+    def render_with_serializer(self, recipe_ids, fields, request) -> list:
+        recipes = prefetch_recipe_queryset(
+            Recipe.objects.defer('search_vector'),
+            fields=fields
+        ).in_bulk(recipe_ids)
+        return RecipeSerializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids],
+            many=True,
+            context={'request': request, 'fieldset': fields}
+        ).data
+
+    def measure(self, render, pages, fields, request, repeat):
+        cpu = 0
+        peak = 0
+        for _ in range(repeat):
+            for recipe_ids in pages:
+                tracemalloc.start()
+                start = time.process_time()
+                render(recipe_ids, fields, request)
+                cpu += time.process_time() - start
+                peak += tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        count = repeat * len(pages)
+        return cpu * 1000 / count, peak / 1024 / count
+
+    def handle(self, *args, **options):
+        request = self.get_request(options['user'])
+        fields = (
+            RecipeSerializer.compact_fields
+            if options['compact']
+            else RecipeSerializer.representation_fields
+        )
+        recipe_ids = list(
+            Recipe.objects.order_by('id').values_list('id', flat=True)[
+                :options['pages'] * options['page_size']
+            ]
+        )
+        pages = [
+            recipe_ids[start:start + options['page_size']]
+            for start in range(0, len(recipe_ids), options['page_size'])
+        ]
+        if not pages:
+            raise CommandError('There are no recipes to render.')
+
+        for recipe_ids in pages:
+            if (self.render_with_serializer(recipe_ids, fields, request)
+                    != render_recipe_rows(recipe_ids, fields, request)):
+                raise CommandError(
+                    'Row rendering output differs from RecipeSerializer.'
+                )
+
+        for name, render in (
+            ('RecipeSerializer', self.render_with_serializer),
+            ('render_recipe_rows', render_recipe_rows),
+        ):
+            cpu, memory = self.measure(
+                render, pages, fields, request, options['repeat']
+            )
+            self.stdout.write(
+                f'{name:<20} {cpu:>9.3f} ms CPU/page '
+                f'{memory:>9.1f} KiB peak/page'
+            )
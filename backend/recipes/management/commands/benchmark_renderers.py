@@ -0,0 +1,91 @@
+from recipes.models import Recipe
+from recipes.serializers import RecipeSerializer
+from services.renderers import ORJSONRenderer, MessagePackRenderer
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+import json
+import time
+
+import msgpack
+
+
+RENDERERS = (JSONRenderer, ORJSONRenderer, MessagePackRenderer)
+
+
+class Command(BaseCommand):
+    help = ('Compares render time and payload size of the API renderers '
+            'on recipe list pages of the current database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=settings.REST_FRAMEWORK['PAGE_SIZE']
+        )
+        parser.add_argument('--repeat', type=int, default=100)
+
+    def get_pages(self, pages: int, page_size: int) -> list:
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        count = Recipe.objects.count()
+
+        result = []
+        for number in range(pages):
+            recipes = Recipe.objects.order_by('id')[
+                number * page_size:(number + 1) * page_size
+            ]
+            if not recipes:
+                break
+            result.append({
+                'count': count,
+                'next': None,
+                'previous': None,
+                'results': RecipeSerializer(
+                    recipes,
+                    many=True,
+                    context={'request': request}
+                ).data
+            })
+        return result
+
+    def handle(self, *args, **options):
+        pages = self.get_pages(options['pages'], options['page_size'])
+        if not pages:
+            raise CommandError('There are no recipes to render.')
+
+        expected = [json.loads(JSONRenderer().render(page)) for page in pages]
+        decoders = {
+            JSONRenderer: json.loads,
+            ORJSONRenderer: json.loads,
+            MessagePackRenderer: msgpack.unpackb,
+        }
+
+        for renderer_class in RENDERERS:
+            renderer = renderer_class()
+            payloads = [renderer.render(page) for page in pages]
+            decode = decoders[renderer_class]
+            if [decode(payload) for payload in payloads] != expected:
+                raise CommandError(
+                    f'{renderer_class.__name__} output differs from JSON.'
+                )
+
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                for page in pages:
+                    renderer.render(page)
+            elapsed = time.perf_counter() - start
+
+            self.stdout.write(
+                f'{renderer_class.__name__:<20} '
+                f'{elapsed * 1000 / (options["repeat"] * len(pages)):>9.3f} '
+                f'ms/page '
+                f'{sum(map(len, payloads)) / len(payloads):>10.0f} bytes/page'
+            )
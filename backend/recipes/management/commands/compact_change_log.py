@@ -0,0 +1,16 @@
+from services.changelog import compact_change_log
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Deletes change log entries older than CHANGE_LOG_RETENTION_DAYS, '
+            'which are superseded by a later change of the same object.')
+
+    def handle(self, *args, **options):
+        count = compact_change_log()
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} change log entries older than '
+            f'{settings.CHANGE_LOG_RETENTION_DAYS} days are compacted.'
+        ))
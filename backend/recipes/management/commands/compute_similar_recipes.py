@@ -0,0 +1,18 @@
+from services.similarity import compute_similar_recipes
+
+from django.core.management.base import BaseCommand
+
+import time
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the most similar recipes of every recipe by '
+            'ingredients and tags.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = compute_similar_recipes()
+        self.stdout.write(self.style.SUCCESS(
+            f'Similar recipes of {count} recipes are computed '
+            f'in {time.monotonic() - started:.1f} s.'
+        ))
@@ -0,0 +1,64 @@
+from services.export import EXPORTERS, EXPORT_CHUNK_SIZE, iter_recipe_chunks
+
+from django.core.management.base import BaseCommand
+
+import os
+import sys
+
+
+class Command(BaseCommand):
+    help = ('Exports all recipes with their tags and ingredients as NDJSON '
+            'or CSV. An interrupted export is resumed with --after.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            dest='export_format',
+            choices=sorted(EXPORTERS),
+            default='ndjson'
+        )
+        parser.add_argument(
+            '--output',
+            help='Path of the output file, stdout by default.'
+        )
+        parser.add_argument(
+            '--after',
+            type=int,
+            default=0,
+            help='Export recipes with id greater than this one.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        # A resumed export, or one appended to a non-empty file,
+        # continues the rows after the header written before.
+        header = not options['after'] and not (
+            options['output']
+            and os.path.exists(options['output'])
+            and os.path.getsize(options['output'])
+        )
+        pieces = EXPORTERS[options['export_format']](
+            iter_recipe_chunks(
+                after=options['after'],
+                chunk_size=options['chunk_size']
+            ),
+            header=header
+        )
+
+        output = (
+            open(options['output'], 'ab')
+            if options['output'] else sys.stdout.buffer
+        )
+        try:
+            for piece in pieces:
+                output.write(
+                    piece if isinstance(piece, bytes) else piece.encode()
+                )
+                output.flush()
+        finally:
+            if options['output']:
+                output.close()
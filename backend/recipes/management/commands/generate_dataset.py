@@ -0,0 +1,507 @@
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeActivity,
+    RecipeIngredient,
+    RecipeTag,
+    Tag,
+)
+from users.models import (
+    User,
+    UserCart,
+    UserCartRecipe,
+    UserFeedEntry,
+    UserRecipe,
+    UserSubscription,
+)
+from services.cache import bump_catalog_version, bump_content_version
+from services.catalog import invalidate_ingredient_snapshot
+from services.search import get_search_backend
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Model
+from django.utils import timezone
+
+import csv
+import io
+import itertools
+import random
+import time
+from datetime import date, datetime, timedelta
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Sequence, Type
+
+from PIL import Image
+
+
+DEFAULT_TAGS = (
+    ('Завтрак', 'orange', 'breakfast'),
+    ('Обед', 'green', 'lunch'),
+    ('Ужин', 'purple', 'dinner'),
+    ('Десерт', 'pink', 'dessert'),
+    ('Выпечка', 'brown', 'bakery'),
+    ('Салат', 'limegreen', 'salad'),
+    ('Суп', 'red', 'soup'),
+    ('Вегетарианское', 'olive', 'vegetarian'),
+)
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей', 'Елена')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев')
+DISHES = ('Салат', 'Суп', 'Пирог', 'Рагу', 'Запеканка', 'Паста', 'Каша')
+STEPS = ('Нарезать', 'Смешать', 'Обжарить', 'Потушить', 'Запечь', 'Отварить')
+
+# Exponent of Zipf distributions: the rank-th most popular tag, ingredient,
+# author or recipe is chosen with probability proportional to 1 / rank ** s.
+ZIPF_EXPONENT = 1.1
+
+# Favorites and shopping cart additions are spread over this many days
+# from the start date.
+ACTIVITY_DAYS = 30
+
+
+def zipf_weights(size: int) -> List[float]:
+    """Cumulative weights of a Zipf distribution over <size> ranks."""
+    return list(itertools.accumulate(
+        1 / rank ** ZIPF_EXPONENT for rank in range(1, size + 1)
+    ))
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Fills the database with a synthetic, production-shaped dataset: '
+            'users, recipes with skewed tags and ingredients, power-law '
+            'favorites, subscriptions, shopping carts and feed timelines. '
+            'The same seed and --start-date on the same database give '
+            'the same dataset, but for the creation times of users and '
+            'recipes. '
+            'Must not run concurrently with other writers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=20,
+            help='Mean number of favorite recipes per user.'
+        )
+        parser.add_argument(
+            '--subscriptions',
+            type=int,
+            default=10,
+            help='Mean number of subscriptions per user.'
+        )
+        parser.add_argument(
+            '--cart',
+            type=int,
+            default=3,
+            help='Mean number of recipes in a shopping cart.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--ingredients',
+            default=str(settings.BASE_DIR.parent / 'data' / 'ingredients.csv'),
+            help='CSV of ingredients to load, if there are none yet.'
+        )
+        parser.add_argument('--password', default='dataset-password')
+        parser.add_argument(
+            '--start-date',
+            type=date.fromisoformat,
+            help=f'First day of favorites and carts, which span '
+                 f'{ACTIVITY_DAYS} days, by default {ACTIVITY_DAYS} days ago.'
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.domain = f'seed{options["seed"]}.dataset.local'
+        if User.objects.filter(email__endswith=f'@{self.domain}').exists():
+            raise CommandError(
+                f'A dataset with seed {options["seed"]} is already generated.'
+            )
+
+        started = time.monotonic()
+        start_date = options['start_date'] or (
+            timezone.localdate() - timedelta(days=ACTIVITY_DAYS)
+        )
+        self.start = timezone.make_aware(
+            datetime.combine(start_date, datetime.min.time())
+        )
+        # (recipe id, date) -> [favorites, shopping carts]
+        self.activity: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+        tag_ids = self.create_tags()
+        ingredients = self.create_ingredients(options['ingredients'])
+        user_ids = self.create_users(options['users'], options['password'])
+        recipe_ids, author_recipes = self.create_recipes(
+            options['recipes'], user_ids, tag_ids, ingredients
+        )
+        self.create_favorites(user_ids, recipe_ids, options['favorites'])
+        subscriptions = self.create_subscriptions(
+            user_ids, options['subscriptions']
+        )
+        self.create_feeds(subscriptions, author_recipes)
+        self.create_carts(user_ids, recipe_ids, options['cart'])
+        self.create_activity()
+
+        # bulk_create sends no signals, so derived data is refreshed at once.
+        get_search_backend().rebuild()
+        bump_content_version()
+        bump_catalog_version()
+        invalidate_ingredient_snapshot()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(user_ids)} users and {len(recipe_ids)} recipes '
+            f'in {time.monotonic() - started:.1f} s.'
+        ))
+
+    def log(self, message: str) -> None:
+        self.stdout.write(message)
+
+    def bulk_create(self, model: Type[Model], objects: list) -> List[int]:
+        """Inserts the objects and returns their ids in insertion order.
+        Not every backend returns ids from a bulk insert, so they are read
+        back as ids greater than the maximum before the insert.
+        """
+        with transaction.atomic():
+            last_id = model.objects.aggregate(Max('id'))['id__max'] or 0
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+            return list(
+                model.objects
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+
+    def insert_rows(self,
+                    model: Type[Model],
+                    fields: Sequence[str],
+                    rows: List[tuple]) -> None:
+        """Inserts plain tuples with multi-row INSERT statements. Link tables
+        make up most of the dataset, and for them building model instances
+        and compiling them in bulk_create costs far more than the insert.
+        """
+        quote_name = connection.ops.quote_name
+        table = quote_name(model._meta.db_table)
+        columns = ', '.join(
+            quote_name(model._meta.get_field(field).column)
+            for field in fields
+        )
+        placeholder = f'({", ".join(["%s"] * len(fields))})'
+        size = min(
+            self.batch_size,
+            connection.ops.bulk_batch_size(fields, rows) or self.batch_size
+        )
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for batch in batched(rows, size):
+                cursor.execute(
+                    f'INSERT INTO {table} ({columns}) '
+                    f'VALUES {", ".join([placeholder] * len(batch))}',
+                    [value for row in batch for value in row]
+                )
+
+    def random_activity_date(self, recipe_id: int, kind: int):
+        """Returns a random moment within ACTIVITY_DAYS from the start
+        date and counts the activity of the recipe on its day.
+        """
+        moment = self.start + timedelta(
+            seconds=self.rng.randrange(ACTIVITY_DAYS * 24 * 60 * 60)
+        )
+        self.activity[recipe_id, timezone.localdate(moment)][kind] += 1
+        return moment
+
+    def create_tags(self) -> List[int]:
+        for name, color, slug in DEFAULT_TAGS:
+            Tag.objects.get_or_create(
+                slug=slug,
+                defaults={'name': name, 'color': color}
+            )
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def create_ingredients(self, path: str) -> List[tuple]:
+        if not Ingredient.objects.exists():
+            with open(path, encoding='utf-8') as file:
+                Ingredient.objects.bulk_create(
+                    [
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in csv.reader(file)
+                    ],
+                    batch_size=self.batch_size
+                )
+        return list(
+            Ingredient.objects.order_by('id').values_list('id', 'name')
+        )
+
+    def create_users(self, count: int, password: str) -> List[int]:
+        """Users are inserted along with their shopping carts, which
+        the post_save signal would otherwise create one by one.
+        """
+        password = make_password(password)
+        self.carts: Dict[int, int] = {}
+        user_ids = []
+        for batch in batched(range(count), self.batch_size):
+            ids = self.bulk_create(User, [
+                User(
+                    email=f'user{number}@{self.domain}',
+                    username=f'user{number}',
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password
+                ) for number in batch
+            ])
+            cart_ids = self.bulk_create(
+                UserCart, [UserCart(user_id=user_id) for user_id in ids]
+            )
+            self.carts.update(zip(ids, cart_ids))
+            user_ids.extend(ids)
+        self.log(f'Users: {len(user_ids)}.')
+        return user_ids
+
+    def save_placeholder_image(self) -> str:
+        content = io.BytesIO()
+        Image.new('RGB', (64, 64), (230, 230, 230)).save(content, 'PNG')
+        field = Recipe._meta.get_field('image')
+        return field.storage.save(
+            f'{field.upload_to}/placeholder.png',
+            ContentFile(content.getvalue())
+        )
+
+    def create_recipes(self,
+                       count: int,
+                       user_ids: List[int],
+                       tag_ids: List[int],
+                       ingredients: List[tuple]) -> tuple:
+        """Authors, tags and ingredients are chosen by Zipf distribution:
+        a few authors write most recipes, a few ingredients are in most of
+        them. All recipes share one placeholder image.
+        """
+        image = self.save_placeholder_image()
+        author_weights = zipf_weights(len(user_ids))
+        tag_weights = zipf_weights(len(tag_ids))
+        ingredient_weights = zipf_weights(len(ingredients))
+
+        recipe_ids = []
+        author_recipes: Dict[int, List[int]] = defaultdict(list)
+        for batch in batched(range(count), self.batch_size):
+            recipes = []
+            for _ in batch:
+                author_id = self.rng.choices(
+                    user_ids, cum_weights=author_weights
+                )[0]
+                recipe_ingredients = {
+                    ingredient: self.rng.randint(1, 1000)
+                    for ingredient in self.rng.choices(
+                        ingredients,
+                        cum_weights=ingredient_weights,
+                        k=self.rng.randint(3, 12)
+                    )
+                }
+                names = [name for _, name in recipe_ingredients]
+                recipes.append((
+                    Recipe(
+                        author_id=author_id,
+                        name=f'{self.rng.choice(DISHES)}: '
+                             f'{" и ".join(names[:2])}',
+                        image=image,
+                        text=' '.join(
+                            f'{self.rng.choice(STEPS)} {name}.'
+                            for name in names
+                        ),
+                        cooking_time=self.rng.randint(5, 240)
+                    ),
+                    set(self.rng.choices(
+                        tag_ids,
+                        cum_weights=tag_weights,
+                        k=self.rng.randint(1, 3)
+                    )),
+                    recipe_ingredients
+                ))
+
+            ids = self.bulk_create(
+                Recipe, [recipe for recipe, _, _ in recipes]
+            )
+            self.insert_rows(RecipeTag, ('recipe', 'tag'), [
+                (recipe_id, tag_id)
+                for recipe_id, (_, tags, _) in zip(ids, recipes)
+                for tag_id in tags
+            ])
+            self.insert_rows(
+                RecipeIngredient,
+                ('recipe', 'ingredient', 'amount'),
+                [
+                    (recipe_id, ingredient_id, amount)
+                    for recipe_id, (_, _, recipe_ingredients)
+                    in zip(ids, recipes)
+                    for (ingredient_id, _), amount
+                    in recipe_ingredients.items()
+                ]
+            )
+
+            for recipe_id, (recipe, _, _) in zip(ids, recipes):
+                author_recipes[recipe.author_id].append(recipe_id)
+            recipe_ids.extend(ids)
+            self.log(f'Recipes: {len(recipe_ids)}/{count}.')
+
+        return recipe_ids, author_recipes
+
+    def power_law_count(self, mean: int, maximum: int) -> int:
+        """Pareto distributed count with the given mean: most users have
+        a few items, a few users have very many.
+        """
+        return min(int(mean * (self.rng.paretovariate(2) - 1)), maximum)
+
+    def choose_distinct(self,
+                        population: List[int],
+                        cum_weights: List[float],
+                        count: int) -> set:
+        return set(self.rng.choices(
+            population, cum_weights=cum_weights, k=count
+        ))
+
+    def create_favorites(self,
+                         user_ids: List[int],
+                         recipe_ids: List[int],
+                         mean: int) -> None:
+        if not recipe_ids:
+            return
+        popularity = recipe_ids[:]
+        self.rng.shuffle(popularity)
+        weights = zipf_weights(len(popularity))
+
+        total = 0
+        for batch in batched(user_ids, self.batch_size):
+            favorites = [
+                (
+                    user_id,
+                    recipe_id,
+                    connection.ops.adapt_datetimefield_value(
+                        self.random_activity_date(recipe_id, 0)
+                    )
+                )
+                for user_id in batch
+                for recipe_id in self.choose_distinct(
+                    popularity,
+                    weights,
+                    self.power_law_count(mean, len(popularity))
+                )
+            ]
+            self.insert_rows(
+                UserRecipe, ('user', 'recipe', 'added_date'), favorites
+            )
+            total += len(favorites)
+        self.log(f'Favorites: {total}.')
+
+    def create_subscriptions(self,
+                             user_ids: List[int],
+                             mean: int) -> List[tuple]:
+        """Users are followed in the same order of popularity as they write
+        recipes, so the most prolific authors have the most followers.
+        """
+        weights = zipf_weights(len(user_ids))
+        now = connection.ops.adapt_datetimefield_value(
+            self.start + timedelta(days=ACTIVITY_DAYS)
+        )
+        subscriptions = []
+        for batch in batched(user_ids, self.batch_size):
+            pairs = [
+                (user_id, author_id)
+                for user_id in batch
+                for author_id in self.choose_distinct(
+                    user_ids,
+                    weights,
+                    self.power_law_count(mean, len(user_ids))
+                ) if author_id != user_id
+            ]
+            self.insert_rows(
+                UserSubscription,
+                ('follower', 'author', 'subscription_date'),
+                [(follower_id, author_id, now)
+                 for follower_id, author_id in pairs]
+            )
+            subscriptions.extend(pairs)
+        self.log(f'Subscriptions: {len(subscriptions)}.')
+        return subscriptions
+
+    def create_feeds(self,
+                     subscriptions: List[tuple],
+                     author_recipes: Dict[int, List[int]]) -> None:
+        """Fills timelines as backfill_feed would: the latest recipes of
+        every followed author, except popular ones, which are pulled on read.
+        An author is followed at most once, so entries never conflict.
+        """
+        followers = Counter(author_id for _, author_id in subscriptions)
+        total = 0
+        for batch in batched(subscriptions, self.batch_size):
+            entries = [
+                (follower_id, author_id, recipe_id)
+                for follower_id, author_id in batch
+                if followers[author_id] <= settings.FEED_FANOUT_FOLLOWERS_LIMIT
+                for recipe_id in author_recipes[author_id][
+                    -settings.FEED_BACKFILL_RECIPES:
+                ]
+            ]
+            self.insert_rows(
+                UserFeedEntry, ('follower', 'author', 'recipe'), entries
+            )
+            total += len(entries)
+        self.log(f'Feed entries: {total}.')
+
+    def create_carts(self,
+                     user_ids: List[int],
+                     recipe_ids: List[int],
+                     mean: int) -> None:
+        if not recipe_ids:
+            return
+
+        total = 0
+        for batch in batched(user_ids, self.batch_size):
+            rows = [
+                (self.carts[user_id], recipe_id)
+                for user_id in batch
+                for recipe_id in self.rng.sample(
+                    recipe_ids,
+                    self.power_law_count(mean, len(recipe_ids))
+                )
+            ]
+            self.insert_rows(
+                UserCartRecipe,
+                ('usercart', 'recipe', 'added_date'),
+                [
+                    (
+                        cart_id,
+                        recipe_id,
+                        connection.ops.adapt_datetimefield_value(
+                            self.random_activity_date(recipe_id, 1)
+                        )
+                    ) for cart_id, recipe_id in rows
+                ]
+            )
+            total += len(rows)
+        self.log(f'Shopping cart recipes: {total}.')
+
+    def create_activity(self) -> None:
+        """Daily activity counters of recipes are written at once from
+        the favorites and shopping cart additions generated.
+        """
+        self.insert_rows(
+            RecipeActivity,
+            ('recipe', 'date', 'favorites', 'shopping_carts'),
+            [
+                (recipe_id, date, favorites, shopping_carts)
+                for (recipe_id, date), (favorites, shopping_carts)
+                in self.activity.items()
+            ]
+        )
+        self.log(f'Recipe activity days: {len(self.activity)}.')
@@ -0,0 +1,11 @@
+from services.search import get_search_backend
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of all recipes.'
+
+    def handle(self, *args, **options):
+        get_search_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS('Search index is rebuilt.'))
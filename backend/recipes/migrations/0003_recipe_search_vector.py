@@ -0,0 +1,65 @@
+# Generated by Django 3.2.7 on 2026-10-19 12:39
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POSTGRESQL_FORWARD = (
+    'CREATE INDEX recipes_recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+
+    "UPDATE recipes_recipe SET search_vector = "
+    "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(text, '')), 'B')",
+)
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS recipes_recipe_search_vector_idx',
+)
+
+SQLITE_FORWARD = (
+    'CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5('
+    "name, text, tokenize = 'unicode61 remove_diacritics 2')",
+
+    'INSERT INTO recipes_recipe_fts (rowid, name, text) '
+    'SELECT id, name, text FROM recipes_recipe',
+)
+SQLITE_BACKWARD = (
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+)
+
+
+def _execute(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _execute(schema_editor, POSTGRESQL_FORWARD)
+    elif vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _execute(schema_editor, POSTGRESQL_BACKWARD)
+    elif vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.7 on 2026-10-19 12:45
+
+from django.db import migrations, models
+import services.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(max_length=4096, storage=services.storage.ContentAddressedStorage(), upload_to='images', verbose_name='фото'),
+        ),
+    ]
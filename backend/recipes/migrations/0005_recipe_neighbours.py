@@ -0,0 +1,26 @@
+# Generated by Django 3.2.7 on 2026-10-19 12:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_image_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeNeighbours',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='recipes.recipe', verbose_name='рецепт')),
+                ('neighbours', models.BinaryField(verbose_name='похожие рецепты')),
+                ('min_score', models.FloatField(default=0, verbose_name='наименьшая схожесть в списке')),
+            ],
+            options={
+                'verbose_name': 'похожие рецепты',
+                'verbose_name_plural': 'похожие рецепты',
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 3.2.7 on 2026-10-19 13:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+import datetime
+
+
+# Favorites and carts, which existed before activity was recorded, have no
+# date. They are counted on a day before any time window, so they only
+# count towards all-time popularity.
+HISTORY_DATE = datetime.date(1970, 1, 1)
+
+
+def backfill_recipe_activity(apps, schema_editor):
+    RecipeActivity = apps.get_model('recipes', 'RecipeActivity')
+    UserRecipe = apps.get_model('users', 'UserRecipe')
+    UserCart = apps.get_model('users', 'UserCart')
+
+    counts = {}
+    for recipe_id, count in (
+        UserRecipe.objects.values('recipe_id')
+        .annotate(count=models.Count('id'))
+        .values_list('recipe_id', 'count')
+    ):
+        counts[recipe_id] = [count, 0]
+    for recipe_id, count in (
+        UserCart.recipes.through.objects.values('recipe_id')
+        .annotate(count=models.Count('id'))
+        .values_list('recipe_id', 'count')
+    ):
+        counts.setdefault(recipe_id, [0, 0])[1] = count
+
+    RecipeActivity.objects.bulk_create(
+        (
+            RecipeActivity(
+                recipe_id=recipe_id,
+                date=HISTORY_DATE,
+                favorites=favorites,
+                shopping_carts=shopping_carts
+            ) for recipe_id, (favorites, shopping_carts) in counts.items()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_neighbours'),
+        ('users', '0003_userrecipe_added_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='день')),
+                ('favorites', models.IntegerField(default=0, verbose_name='добавления в избранное')),
+                ('shopping_carts', models.IntegerField(default=0, verbose_name='добавления в корзину покупок')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe', verbose_name='рецепт')),
+            ],
+            options={
+                'verbose_name': 'активность рецепта за день',
+                'verbose_name_plural': 'активность рецептов по дням',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipeactivity',
+            index=models.Index(fields=['date'], name='recipe_activity_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeactivity',
+            constraint=models.UniqueConstraint(fields=('recipe_id', 'date'), name='recipe_activity_unique_constraint'),
+        ),
+        migrations.RunPython(
+            backfill_recipe_activity,
+            migrations.RunPython.noop
+        ),
+    ]
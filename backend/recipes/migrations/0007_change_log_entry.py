@@ -0,0 +1,35 @@
+# Generated by Django 3.2.7 on 2026-10-19 13:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0006_recipe_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'рецепт'), ('favorite', 'избранное'), ('shopping_cart', 'список покупок'), ('subscription', 'подписка')], max_length=16, verbose_name='тип объекта')),
+                ('action', models.CharField(choices=[('created', 'создание'), ('updated', 'изменение'), ('deleted', 'удаление')], max_length=16, verbose_name='действие')),
+                ('object_id', models.BigIntegerField(verbose_name='id объекта')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='дата изменения')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'запись журнала изменений',
+                'verbose_name_plural': 'журнал изменений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['kind', 'object_id'], name='change_log_object_idx'),
+        ),
+    ]
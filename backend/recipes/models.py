@@ -1,10 +1,17 @@
+from services.storage import ContentAddressedStorage
+
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
 User = get_user_model()
 
+# Upper bounds of a cooking time, in minutes, and of an ingredient amount.
+MAX_COOKING_TIME = 44640
+MAX_INGREDIENT_AMOUNT = 44640
+
 
 class Recipe(models.Model):
     author = models.ForeignKey(
@@ -21,7 +28,8 @@ class Recipe(models.Model):
 
     image = models.ImageField(
         max_length=4096,
-        upload_to='images/%Y-%m-%d',
+        upload_to='images',
+        storage=ContentAddressedStorage(),
         verbose_name='фото',
     )
 
@@ -43,7 +51,7 @@ class Recipe(models.Model):
         default=60,
         validators=(
             MinValueValidator(1),
-            MaxValueValidator(44640)
+            MaxValueValidator(MAX_COOKING_TIME)
         ),
         verbose_name='время приготовления (в минутах)',
     )
@@ -53,6 +61,12 @@ class Recipe(models.Model):
         verbose_name='дата создания рецепта',
     )
 
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='поисковый вектор',
+    )
+
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'рецепты'
@@ -123,7 +137,7 @@ class RecipeIngredient(models.Model):
         default=1,
         validators=(
             MinValueValidator(1),
-            MaxValueValidator(44640)
+            MaxValueValidator(MAX_INGREDIENT_AMOUNT)
         ),
         verbose_name='количество',
     )
@@ -172,3 +186,146 @@ class RecipeTag(models.Model):
 
     def __str__(self):
         return f'РецептТэг - id: {self.id}.'
+
+
+class RecipeNeighbours(models.Model):
+    """Most similar recipes of a recipe by ingredients and tags, packed as
+    an array of (id, score) records in descending order of score. See
+    services.similarity for how they are computed.
+    """
+    recipe = models.OneToOneField(
+        'Recipe',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='рецепт',
+    )
+
+    neighbours = models.BinaryField(verbose_name='похожие рецепты')
+
+    min_score = models.FloatField(
+        default=0,
+        verbose_name='наименьшая схожесть в списке',
+    )
+
+    class Meta:
+        verbose_name = 'похожие рецепты'
+        verbose_name_plural = 'похожие рецепты'
+
+    def __str__(self):
+        return f'ПохожиеРецепты - id рецепта: {self.recipe_id}.'
+
+
+class RecipeActivity(models.Model):
+    """Daily counters of a recipe: how many times it was added to favorites
+    and to shopping carts on <date>, less the removals. Popularity over a
+    time window is the sum of the daily counters within it, see
+    services.trending.
+    """
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='рецепт',
+    )
+
+    date = models.DateField(verbose_name='день')
+
+    favorites = models.IntegerField(
+        default=0,
+        verbose_name='добавления в избранное',
+    )
+
+    shopping_carts = models.IntegerField(
+        default=0,
+        verbose_name='добавления в корзину покупок',
+    )
+
+    class Meta:
+        verbose_name = 'активность рецепта за день'
+        verbose_name_plural = 'активность рецептов по дням'
+
+        indexes = (
+            models.Index(fields=('date',), name='recipe_activity_date_idx'),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe_id', 'date'),
+                name='recipe_activity_unique_constraint'
+            ),
+        )
+
+    def __str__(self):
+        return (f'АктивностьРецепта - id рецепта: {self.recipe_id}, '
+                f'день: {self.date}.')
+
+
+class ChangeLogEntry(models.Model):
+    """Append-only log of changes, read by clients and caches by cursor
+    (<id>) to apply deltas instead of reloading. A change of a recipe is
+    public, a toggle of a favorite, a shopping cart recipe or a subscription
+    belongs to its <user>. See services.changelog.
+    """
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    SUBSCRIPTION = 'subscription'
+    KINDS = (
+        (RECIPE, 'рецепт'),
+        (FAVORITE, 'избранное'),
+        (SHOPPING_CART, 'список покупок'),
+        (SUBSCRIPTION, 'подписка'),
+    )
+
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = (
+        (CREATED, 'создание'),
+        (UPDATED, 'изменение'),
+        (DELETED, 'удаление'),
+    )
+
+    kind = models.CharField(
+        max_length=16,
+        choices=KINDS,
+        verbose_name='тип объекта',
+    )
+
+    action = models.CharField(
+        max_length=16,
+        choices=ACTIONS,
+        verbose_name='действие',
+    )
+
+    object_id = models.BigIntegerField(verbose_name='id объекта')
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='пользователь',
+    )
+
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='дата изменения',
+    )
+
+    class Meta:
+        verbose_name = 'запись журнала изменений'
+        verbose_name_plural = 'журнал изменений'
+
+        indexes = (
+            models.Index(
+                fields=('kind', 'object_id'),
+                name='change_log_object_idx'
+            ),
+        )
+
+    def __str__(self):
+        return (f'ЗаписьЖурнала - id: {self.id}, {self.kind} '
+                f'{self.object_id}: {self.action}.')
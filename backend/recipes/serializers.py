@@ -1,9 +1,17 @@
-from .models import Recipe, Ingredient, Tag, RecipeIngredient, User
+from .models import (
+    MAX_INGREDIENT_AMOUNT,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+    User,
+)
 from users.serializers import GETUserSerializer
 from services.serializer_fields import (
     Base64ToContentFileField,
     HEXToColourNameField
 )
+from services.fieldsets import SparseFieldsetMixin
 from services.functions import (
     create_recipe,
     update_recipe,
@@ -14,47 +22,113 @@ from services.functions import (
 from rest_framework import serializers
 from rest_framework.request import Request
 
+from typing import Dict, Iterable, List, Union
+
+
+def validate_existing_ids(model, ids: Iterable[int], name: str) -> None:
+    """Checks, that objects with all the ids exist, with one query."""
+    ids = set(ids)
+    missing = ids - set(
+        model.objects.filter(id__in=ids).values_list('id', flat=True)
+    )
+    if missing:
+        raise serializers.ValidationError(
+            f'{name} do not exist: {", ".join(map(str, sorted(missing)))}.'
+        )
+
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeIngredientWriteSerializer(serializers.Serializer):
+    """An ingredient of a recipe in a create or update request, bounded
+    as <RecipeIngredient.amount>.
+    """
+    id = serializers.IntegerField(min_value=1)
+    amount = serializers.IntegerField(
+        min_value=1,
+        max_value=MAX_INGREDIENT_AMOUNT
+    )
+
+
+class RecipeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     image = Base64ToContentFileField()
-    ingredients = serializers.JSONField()
+    ingredients = RecipeIngredientWriteSerializer(many=True, allow_empty=False)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
 
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
-        read_only=False
+    representation_fields = (
+        'id',
+        'name',
+        'image',
+        'text',
+        'cooking_time',
+        'tags',
+        'author',
+        'ingredients',
+        'is_favorited',
+        'is_in_shopping_cart',
+    )
+    compact_fields = (
+        'id',
+        'name',
+        'image',
+        'cooking_time',
+        'tags',
+        'author',
+        'is_favorited',
+        'is_in_shopping_cart',
     )
 
-    def to_representation(self, recipe: Recipe) -> dict:
-        return {
-            'id': recipe.id,
-            'name': recipe.name,
-            'image': recipe.image.url if recipe.image else None,
-            'text': recipe.text,
-            'cooking_time': recipe.cooking_time,
-            'tags': TagSerializer(recipe.tags, many=True).data,
-
-
-            'author': GETUserSerializer(
-                recipe.author,
-                context={'request': self.context['request']}
-            ).data,
-
-            'ingredients': RecipeIngredientSerializer(
-                RecipeIngredient.objects.filter(recipe=recipe),
-                many=True
-            ).data,
-
-            'is_favorited': is_favorited(
-                recipe=recipe,
-                request=self.context['request']
-            ),
-
-            'is_in_shopping_cart': is_in_shopping_cart(
-                recipe=recipe,
-                request=self.context['request']
+    def get_image(self, recipe: Recipe) -> Union[str, None]:
+        return recipe.image.url if recipe.image else None
+
+    def get_tags(self, recipe: Recipe) -> list:
+        return TagSerializer(recipe.tags, many=True).data
+
+    def get_author(self, recipe: Recipe) -> dict:
+        return GETUserSerializer(
+            recipe.author,
+            context={'request': self.context['request'], 'fieldset': None}
+        ).data
+
+    def get_ingredients(self, recipe: Recipe) -> list:
+        return RecipeIngredientSerializer(
+            recipe.recipeingredient_set.all(),
+            many=True
+        ).data
+
+    def get_is_favorited(self, recipe: Recipe) -> bool:
+        return is_favorited(recipe=recipe, request=self.context['request'])
+
+    def get_is_in_shopping_cart(self, recipe: Recipe) -> bool:
+        return is_in_shopping_cart(
+            recipe=recipe,
+            request=self.context['request']
+        )
+
+    def validate_ingredients(self, ingredients: List[dict]) -> List[dict]:
+        """Merges duplicate ingredients by summing their amounts and checks,
+        that all of them exist, with one query.
+        """
+        amounts: Dict[int, int] = {}
+        for ingredient in ingredients:
+            amounts[ingredient['id']] = (
+                amounts.get(ingredient['id'], 0) + ingredient['amount']
             )
-        }
+        if any(amount > MAX_INGREDIENT_AMOUNT for amount in amounts.values()):
+            raise serializers.ValidationError(
+                'Total amount of an ingredient must not exceed '
+                f'{MAX_INGREDIENT_AMOUNT}.'
+            )
+        validate_existing_ids(Ingredient, amounts, 'Ingredients')
+        return [
+            {'id': id, 'amount': amount} for id, amount in amounts.items()
+        ]
+
+    def validate_tags(self, tag_ids: List[int]) -> List[int]:
+        tag_ids = list(dict.fromkeys(tag_ids))
+        validate_existing_ids(Tag, tag_ids, 'Tags')
+        return tag_ids
 
     def create(self, validated_data: dict) -> Recipe:
         return create_recipe(
@@ -0,0 +1,107 @@
+from .models import (
+    ChangeLogEntry,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    Tag,
+)
+from services.catalog import invalidate_ingredient_snapshot
+from services.changelog import log_change
+from services.cache import bump_content_version, bump_catalog_version
+from services.indexes import refresh_recipe_indexes
+from services.search import get_search_backend
+from services.tasks import run_in_background
+
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, **kwargs):
+    """Updates the search index of a recipe on every write, including
+    the admin site, since <Recipe.save> may overwrite the stored vector.
+    """
+    get_search_backend().index([instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_index(sender, instance, **kwargs):
+    get_search_backend().remove([instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_indexes(sender, instance, **kwargs):
+    run_in_background(refresh_recipe_indexes, recipe_id=instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def log_recipe_change(sender, instance, **kwargs):
+    """Logs every write of a recipe, including the admin site, in its
+    transaction.
+    """
+    if 'created' not in kwargs:
+        action = ChangeLogEntry.DELETED
+    elif kwargs['created']:
+        action = ChangeLogEntry.CREATED
+    else:
+        action = ChangeLogEntry.UPDATED
+    log_change(ChangeLogEntry.RECIPE, action, instance.id)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def log_recipe_relation_change(sender, instance, **kwargs):
+    """Logs an update of the recipe of a tag or an ingredient row, e.g.
+    edited inline in the admin site.
+    """
+    log_change(
+        ChangeLogEntry.RECIPE, ChangeLogEntry.UPDATED, instance.recipe_id
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def log_recipe_relations_change(sender, instance, action, reverse, **kwargs):
+    """Tags and ingredients added or removed in bulk send no post_save."""
+    if not action.startswith('post_'):
+        return
+    recipe_ids = (kwargs['pk_set'] or ()) if reverse else [instance.id]
+    for recipe_id in recipe_ids:
+        log_change(
+            ChangeLogEntry.RECIPE, ChangeLogEntry.UPDATED, recipe_id
+        )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_cached_responses(sender, **kwargs):
+    if kwargs.get('action', 'post_').startswith('post_'):
+        bump_content_version()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_cached_recipes(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_catalog(sender, **kwargs):
+    invalidate_ingredient_snapshot()
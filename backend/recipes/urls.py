@@ -20,10 +20,55 @@ urlpatterns = [
         ),
         name='user_shopping_cart_view'
     ),
+    path(
+        'recipes/<int:id>/similar/',
+        views.RecipeSimilarView.as_view(),
+        name='recipe_similar_view'
+    ),
     path(
         'recipes/download_shopping_cart/',
         views.DownloadShoppingCartView.as_view(),
         name='download_shopping_cart'
+    ),
+    path(
+        'recipes/pantry/',
+        views.RecipePantryView.as_view(),
+        name='recipe_pantry_view'
+    ),
+    path(
+        'recipes/facets/',
+        views.RecipeFacetView.as_view(),
+        name='recipe_facet_view'
+    ),
+    path(
+        'recipes/images/',
+        views.RecipeImageUploadView.as_view(),
+        name='recipe_image_upload_view'
+    ),
+    path(
+        'recipes/feed/',
+        views.RecipeFeedView.as_view(),
+        name='recipe_feed_view'
+    ),
+    path(
+        'recipes/export/<str:export_format>/',
+        views.RecipeExportView.as_view(),
+        name='recipe_export_view'
+    ),
+    path(
+        'changes/',
+        views.ChangeLogView.as_view(),
+        name='change_log_view'
+    ),
+    path(
+        'ingredients/snapshot/',
+        views.IngredientSnapshotView.as_view(),
+        name='ingredient_snapshot_view'
+    ),
+    path(
+        'ingredients/snapshot/<str:version>/',
+        views.IngredientSnapshotView.as_view(),
+        name='ingredient_snapshot_version_view'
     )
 ]
 
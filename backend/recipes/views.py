@@ -9,36 +9,376 @@ from users.serializers import (
     UserFavoriteRecipeSerializer,
     UserShoppingCartSerializer
 )
-from users.models import UserCart
+from users.models import UserCart, UserRecipe
 from services.functions import (
-    get_recipe_queryset, get_ingredient_queryset, load_ingredients
+    get_recipe_queryset,
+    get_ingredient_queryset,
+    load_ingredients,
+    prefetch_recipe_queryset,
 )
-from services.pagination import CustomPageNumberPagination
+from services.cache import (
+    AnonymousResponseCacheMixin,
+    get_response_cache_key,
+)
+from services.catalog import accepts_encoding, get_ingredient_snapshot
+from services.changelog import get_changes
+from services.export import (
+    EXPORTERS,
+    EXPORT_CONTENT_TYPES,
+    iter_recipe_chunks,
+)
+from services.feed import get_feed_recipe_ids
+from services.indexes import (
+    COOKING_TIME_BUCKETS,
+    get_tag_ids,
+    recipe_index,
+)
+from services.rows import (
+    CachedRecipeRowMixin,
+    get_followed_author_ids,
+    render_cached_recipe_rows,
+)
+from services.pagination import (
+    ApproximateCountPagination,
+    CustomPageNumberPagination,
+    KeysetPagination,
+)
+from services.similarity import get_similar_recipe_ids
+from services.singleflight import single_flight
+from services.trending import (
+    DEFAULT_TRENDING_WINDOW,
+    TRENDING_WINDOWS,
+    get_trending_recipe_ids,
+)
+from services.uploads import LengthRequired, store_image_upload
 
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse, JsonResponse
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.core.exceptions import ObjectDoesNotExist
 
 from rest_framework import views, viewsets
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import _positive_int
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework import status
 
+import gzip
+
+import numpy as np
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousResponseCacheMixin,
+                    CachedRecipeRowMixin,
+                    viewsets.ModelViewSet):
     permission_classes = (RecipePermission,)
     serializer_class = RecipeSerializer
-    pagination_class = CustomPageNumberPagination
+    pagination_class = ApproximateCountPagination
+    throttle_scope = 'recipe_write'
+    throttle_methods = ('POST', 'PUT', 'PATCH', 'DELETE')
 
     def get_queryset(self):
         return get_recipe_queryset(self)
 
+    def get_response_cache_timeout(self, request):
+        if request.query_params.get('ordering') == 'trending':
+            return settings.TRENDING_RESPONSE_CACHE_TIMEOUT
+        return super().get_response_cache_timeout(request)
+
+    def get_recipe_rows(self, queryset):
+        """With <ordering=trending> lists the most popular recipes of
+        the <window> (day, week or all), which pass the filters.
+        """
+        if self.request.query_params.get('ordering') != 'trending':
+            return super().get_recipe_rows(queryset)
+
+        window = self.request.query_params.get(
+            'window', DEFAULT_TRENDING_WINDOW
+        )
+        if window not in TRENDING_WINDOWS:
+            raise ValidationError({
+                'window': f'Must be one of: {", ".join(TRENDING_WINDOWS)}.'
+            })
+        recipe_ids = get_trending_recipe_ids(window)
+        creation_dates = dict(
+            queryset.filter(id__in=recipe_ids)
+            .values_list('id', 'creation_date')
+        )
+        return [
+            (recipe_id, creation_dates[recipe_id])
+            for recipe_id in recipe_ids if recipe_id in creation_dates
+        ]
+
+
+class RecipeFeedView(views.APIView):
+    """Recipes of the authors the user is subscribed on, newest first.
+    Paginated by keyset over the user's precomputed timeline.
+    """
+    permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+
+    def get(self, request):
+        paginator = self.pagination_class()
+        recipe_ids = paginator.paginate_ids(
+            get_feed_recipe_ids(
+                follower_id=request.user.id,
+                before=paginator.get_cursor(request),
+                limit=paginator.get_page_size(request) + 1,
+                followed_author_ids=get_followed_author_ids(request)
+            ),
+            request=request
+        )
+        recipes = prefetch_recipe_queryset(
+            Recipe.objects.defer('search_vector'),
+            fields=RecipeSerializer.get_requested_fields(request, many=True)
+        ).in_bulk(recipe_ids)
+        serializer = RecipeSerializer(
+            [recipes[id] for id in recipe_ids if id in recipes],
+            many=True,
+            context={'request': request}
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+
+class RecipeSimilarView(views.APIView):
+    """The most similar recipes by ingredients and tags, most similar
+    first, read from precomputed neighbours of the recipe.
+    """
+    def get(self, request, id):
+        recipe_ids = get_similar_recipe_ids(id)
+        if recipe_ids is None:
+            get_object_or_404(Recipe.objects.only('id'), id=id)
+            recipe_ids = []
+
+        creation_dates = dict(
+            Recipe.objects
+            .filter(id__in=recipe_ids)
+            .values_list('id', 'creation_date')
+        )
+        return Response(render_cached_recipe_rows(
+            [
+                (recipe_id, creation_dates[recipe_id])
+                for recipe_id in recipe_ids if recipe_id in creation_dates
+            ],
+            RecipeSerializer.get_requested_fields(request, many=True),
+            request
+        ))
+
+
+class RecipePantryView(views.APIView):
+    """Recipes, which can be cooked from the given <ingredients>, ranked by
+    the number of matched ingredients, then of missing ones. Filtered by
+    any of <tags>, <max_cooking_time> and <max_missing> ingredients.
+    Served from the in-process ingredient index.
+    """
+    pagination_class = CustomPageNumberPagination
+
+    def get_int_params(self, request, name):
+        try:
+            return [
+                _positive_int(value)
+                for values in request.query_params.getlist(name)
+                for value in values.split(',') if value
+            ]
+        except ValueError:
+            raise ValidationError({name: 'Must be non-negative integers.'})
+
+    def get(self, request):
+        ingredient_ids = self.get_int_params(request, 'ingredients')
+        if not ingredient_ids:
+            raise ValidationError({'ingredients': 'This field is required.'})
+        max_cooking_time = self.get_int_params(request, 'max_cooking_time')
+        max_missing = self.get_int_params(request, 'max_missing')
+        slugs = request.query_params.getlist('tags')
+
+        results = recipe_index.search_pantry(
+            ingredient_ids=ingredient_ids,
+            tag_ids=get_tag_ids(slugs) if slugs else (),
+            max_cooking_time=max_cooking_time[0] if max_cooking_time else None,
+            max_missing=max_missing[0] if max_missing else None
+        )
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(results, request, view=self)
+        creation_dates = dict(
+            Recipe.objects
+            .filter(id__in=[recipe_id for recipe_id, _, _ in page])
+            .values_list('id', 'creation_date')
+        )
+        page = [result for result in page if result[0] in creation_dates]
+
+        recipes = render_cached_recipe_rows(
+            [
+                (recipe_id, creation_dates[recipe_id])
+                for recipe_id, _, _ in page
+            ],
+            RecipeSerializer.get_requested_fields(request, many=True),
+            request
+        )
+        for recipe, (_, matched, missing) in zip(recipes, page):
+            recipe['matched_ingredients'] = matched
+            recipe['missing_ingredients'] = missing
+        return paginator.get_paginated_response(recipes)
+
+
+class RecipeFacetView(views.APIView):
+    """Recipes filtered by any of <tags> (all of them with <tags_mode=all>),
+    <author>, <is_favorited>, <is_in_shopping_cart> and <cooking_time>
+    bucket numbers, newest first, along with recipe counts per tag and per
+    cooking time bucket. Served from the in-process facet index.
+    """
+    pagination_class = CustomPageNumberPagination
+
+    def get_recipe_sets(self, request):
+        if not request.user.is_authenticated:
+            return []
+        recipe_sets = []
+        if request.query_params.get('is_favorited'):
+            recipe_sets.append(
+                UserRecipe.objects.filter(user_id=request.user.id)
+                .values_list('recipe_id', flat=True)
+            )
+        if request.query_params.get('is_in_shopping_cart'):
+            recipe_sets.append(
+                UserCart.recipes.through.objects
+                .filter(usercart__user_id=request.user.id)
+                .values_list('recipe_id', flat=True)
+            )
+        return [
+            np.unique(np.fromiter(recipe_ids, dtype=np.int64))
+            for recipe_ids in recipe_sets
+        ]
+
+    def get(self, request):
+        try:
+            author_id = request.query_params.get('author')
+            author_id = int(author_id) if author_id else None
+            cooking_time_buckets = [
+                int(bucket)
+                for bucket in request.query_params.getlist('cooking_time')
+            ]
+        except ValueError:
+            raise ValidationError('Author and cooking time must be integers.')
+
+        tags = list(Tag.objects.order_by('id').values_list('id', 'slug'))
+        slugs = set(request.query_params.getlist('tags'))
+        result = recipe_index.search_facets(
+            tag_ids=[id for id, slug in tags if slug in slugs],
+            all_tags=request.query_params.get('tags_mode') == 'all',
+            author_id=author_id,
+            recipe_sets=self.get_recipe_sets(request),
+            cooking_time_buckets=cooking_time_buckets
+        )
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(
+            result.recipe_ids, request, view=self
+        )
+        creation_dates = dict(
+            Recipe.objects
+            .filter(id__in=page)
+            .values_list('id', 'creation_date')
+        )
+        response = paginator.get_paginated_response(render_cached_recipe_rows(
+            [
+                (recipe_id, creation_dates[recipe_id])
+                for recipe_id in page if recipe_id in creation_dates
+            ],
+            RecipeSerializer.get_requested_fields(request, many=True),
+            request
+        ))
+
+        bounds = (0,) + COOKING_TIME_BUCKETS + (None,)
+        response.data['facets'] = {
+            'tags': [
+                {'slug': slug, 'count': result.tag_counts.get(id, 0)}
+                for id, slug in tags
+            ],
+            'cooking_time': [
+                {
+                    'bucket': bucket,
+                    'min': bounds[bucket] + 1,
+                    'max': bounds[bucket + 1],
+                    'count': count,
+                }
+                for bucket, count in enumerate(result.cooking_time_counts)
+            ],
+        }
+        return response
+
+
+class RecipeImageUploadView(views.APIView):
+    """Receives a recipe image as the raw request body, e.g. with
+    Content-Type: image/png, streaming it to disk, and returns an upload id
+    to send as <image> of a recipe instead of a base64 string.
+    """
+    permission_classes = (IsAuthenticated,)
+    throttle_scope = 'recipe_write'
+
+    def post(self, request):
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if not content_length:
+            raise LengthRequired()
+
+        upload_id, name = store_image_upload(
+            request.stream, content_length, user_id=request.user.id
+        )
+        return Response(
+            {
+                'upload_id': upload_id,
+                'image': Recipe._meta.get_field('image').storage.url(name),
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+
+class RecipeExportView(views.APIView):
+    """Streams all recipes with their tags and ingredients as NDJSON or CSV,
+    ordered by id. An interrupted export is resumed with <after>,
+    the last exported id, without the CSV header.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, export_format):
+        if export_format not in EXPORTERS:
+            raise NotFound(f'Unknown export format: {export_format}.')
+
+        try:
+            after = _positive_int(request.query_params.get('after', 0))
+        except ValueError:
+            raise ValidationError('After must be a positive integer.')
+
+        response = StreamingHttpResponse(
+            EXPORTERS[export_format](
+                iter_recipe_chunks(after=after),
+                header=not after
+            ),
+            content_type=EXPORT_CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{export_format}"'
+        )
+        return response
+
 
 class TagViewSet(viewsets.ViewSet):
     def list(self, request):
-        queryset = Tag.objects.all()
-        serializer = TagSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(single_flight(
+            get_response_cache_key(request),
+            lambda: TagSerializer(Tag.objects.all(), many=True).data
+        ))
 
     def retrieve(self, request, pk=None):
         queryset = Tag.objects.all()
@@ -49,11 +389,13 @@ class TagViewSet(viewsets.ViewSet):
 
 class IngredientViewSet(viewsets.ViewSet):
     def list(self, request):
-        serializer = IngredientSerializer(
-            get_ingredient_queryset(request),
-            many=True
-        )
-        return Response(serializer.data)
+        return Response(single_flight(
+            get_response_cache_key(request),
+            lambda: IngredientSerializer(
+                get_ingredient_queryset(request),
+                many=True
+            ).data
+        ))
 
     def retrieve(self, request, pk=None):
         queryset = Ingredient.objects.all()
@@ -62,6 +404,84 @@ class IngredientViewSet(viewsets.ViewSet):
         return Response(serializer.data)
 
 
+class ChangeLogView(views.APIView):
+    """Changes after the <since> cursor in the order they happened:
+    recipes created, updated or deleted, and, for an authenticated user,
+    their favorites, shopping cart recipes and subscriptions added
+    or removed. The next request is sent with the returned <cursor>.
+    """
+    page_size = 100
+    max_page_size = 1000
+
+    def get(self, request):
+        try:
+            since = _positive_int(request.query_params.get('since', 0))
+            limit = _positive_int(
+                request.query_params.get('limit', self.page_size),
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except ValueError:
+            raise ValidationError('Since and limit must be positive integers.')
+
+        changes, has_more = get_changes(
+            since=since,
+            limit=limit,
+            user_id=request.user.id if request.user.is_authenticated else None
+        )
+        return Response({
+            'cursor': changes[-1]['id'] if changes else since,
+            'has_more': has_more,
+            'results': changes,
+        })
+
+
+class IngredientSnapshotView(views.APIView):
+    """The whole ingredient catalog as a precompressed JSON snapshot, so that
+    clients can search ingredients locally. The unversioned URL redirects to
+    the current version, which is served with far-future cache headers.
+    """
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request, version=None):
+        snapshot = get_ingredient_snapshot()
+
+        if version != snapshot.version:
+            response = HttpResponseRedirect(reverse(
+                'ingredient_snapshot_version_view',
+                kwargs={'version': snapshot.version}
+            ))
+            patch_cache_control(response, no_cache=True)
+            return response
+
+        etag = f'"{snapshot.version}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        elif accepts_encoding(
+                request.headers.get('Accept-Encoding', ''), 'gzip'):
+            response = HttpResponse(
+                snapshot.content,
+                content_type='application/json'
+            )
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(
+                gzip.decompress(snapshot.content),
+                content_type='application/json'
+            )
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=60 * 60 * 24 * 365,
+            immutable=True
+        )
+        return response
+
+
 class UserFavoriteRecipeViewSet(viewsets.ViewSet):
     permission_classes = (IsAuthenticated,)
 
@@ -103,6 +523,8 @@ class UserShoppingCartViewSet(viewsets.ViewSet):
 
 
 class DownloadShoppingCartView(views.APIView):
+    throttle_scope = 'download'
+
     def get(self, request):
         try:
             with open(file=f'{request.user.shopping_cart.id}_SC.txt',
@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from rest_framework.exceptions import AuthenticationFailed
+
+import time
+import uuid
+from typing import Dict
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+
+
+REVOKED_SESSION_CACHE_KEY = 'auth:revoked-session:{}'
+REVOKED_BEFORE_CACHE_KEY = 'auth:revoked-before:{}'
+# Claims added to the tokens of a login: the session shared by its refresh
+# and access tokens, and the issue time. Issue and revocation times keep
+# fractions of a second, so a login in the second of a revocation survives it.
+SESSION_CLAIM = 'sid'
+ISSUED_AT_CLAIM = 'iat'
+
+
+def get_revocation_timeout() -> int:
+    """A revocation is kept as long as a token issued before it lives."""
+    return int(jwt_settings.REFRESH_TOKEN_LIFETIME.total_seconds()) + 1
+
+
+def issue_tokens(user) -> Dict[str, str]:
+    """Issues a refresh token and a short-lived access token of
+    a new session of the user.
+    """
+    refresh = RefreshToken.for_user(user)
+    refresh[SESSION_CLAIM] = uuid.uuid4().hex
+    refresh[ISSUED_AT_CLAIM] = time.time()
+    return {'auth_token': str(refresh.access_token), 'refresh': str(refresh)}
+
+
+def refresh_access_token(raw_refresh_token: str) -> str:
+    """Returns a new access token of the session of a valid, not revoked
+    refresh token.
+    """
+    try:
+        refresh = RefreshToken(raw_refresh_token)
+    except TokenError as error:
+        raise InvalidToken(error.args[0])
+    check_not_revoked(refresh)
+    return str(refresh.access_token)
+
+
+def revoke_session(token: Token) -> None:
+    """Revokes the refresh and access tokens of a login."""
+    cache.set(
+        REVOKED_SESSION_CACHE_KEY.format(token[SESSION_CLAIM]),
+        True,
+        timeout=get_revocation_timeout()
+    )
+
+
+def revoke_user_tokens(user_id: int) -> None:
+    """Revokes all tokens of the user issued until now,
+    e.g. after the password is changed.
+    """
+    cache.set(
+        REVOKED_BEFORE_CACHE_KEY.format(user_id),
+        time.time(),
+        timeout=get_revocation_timeout()
+    )
+
+
+def check_not_revoked(token: Token) -> None:
+    """Looks up both revocations of a token with one cache request."""
+    session_key = REVOKED_SESSION_CACHE_KEY.format(token.get(SESSION_CLAIM))
+    user_key = REVOKED_BEFORE_CACHE_KEY.format(
+        token.get(jwt_settings.USER_ID_CLAIM)
+    )
+    revoked = cache.get_many([session_key, user_key])
+    if (session_key in revoked
+            or token.get(ISSUED_AT_CLAIM, 0) < revoked.get(user_key, -1)):
+        raise InvalidToken('Token is revoked.')
+
+
+class LazyTokenUser(SimpleLazyObject):
+    """The user of a token, loaded from the database on first access to
+    a field other than <id>, <pk> or the authentication flags, so requests,
+    which only need the user id, do not query the user at all.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id: int):
+        self.__dict__['_user_id'] = user_id
+        super().__init__(lambda: self.load_user(user_id))
+
+    @staticmethod
+    def load_user(user_id: int):
+        user = (
+            get_user_model().objects
+            .filter(pk=user_id, is_active=True)
+            .first()
+        )
+        if user is None:
+            raise AuthenticationFailed('User not found.', code='user_not_found')
+        return user
+
+    @property
+    def id(self) -> int:
+        return self.__dict__['_user_id']
+
+    pk = id
+
+    def __bool__(self) -> bool:
+        return True
+
+
+class StatelessTokenAuthentication(JWTAuthentication):
+    """Authenticates by a signed access token (AUTH_TOKEN_MODE = 'jwt')
+    without database queries: the token is verified cryptographically and
+    checked against the revocations in the cache, the user is loaded lazily.
+    Credentials, which are not a JWT, are left to the next authentication
+    class, so legacy tokens keep working.
+    """
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None or raw_token.count(b'.') != 2:
+            return None
+
+        token = self.get_validated_token(raw_token)
+        check_not_revoked(token)
+        return LazyTokenUser(token[jwt_settings.USER_ID_CLAIM]), token
+
+
+def is_stateless_mode() -> bool:
+    return settings.AUTH_TOKEN_MODE == 'jwt'
@@ -0,0 +1,130 @@
+from services.singleflight import single_flight
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+import hashlib
+import time
+from typing import Callable
+from urllib.parse import urlencode
+
+
+CONTENT_VERSION_KEY = 'recipes:content-version'
+CATALOG_VERSION_KEY = 'recipes:catalog-version'
+RESPONSE_CACHE_KEY = 'response:{version}:{digest}'
+
+
+def get_version(key: str) -> int:
+    """Returns a version counter stored in the cache. A missing version is
+    initialized from the current time, so it never goes back to a value,
+    which was used before the cache was flushed.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def increment_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_version(key)
+
+
+def bump_version(key: str) -> None:
+    """Makes all entries cached for the previous version unreachable,
+    once the current transaction commits: a response cached meanwhile
+    holds the old content and must not get the new version.
+    """
+    transaction.on_commit(lambda: increment_version(key))
+
+
+def get_content_version() -> int:
+    """Returns the global version of recipes, tags and ingredients."""
+    return get_version(CONTENT_VERSION_KEY)
+
+
+def bump_content_version() -> None:
+    bump_version(CONTENT_VERSION_KEY)
+
+
+def get_catalog_version() -> int:
+    """Returns the version of tags and ingredients, which are embedded into
+    recipe representations, but rarely change.
+    """
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version() -> None:
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def get_response_cache_key(request: Request) -> str:
+    """Returns a cache key of the current content version, the requested
+    URL and its normalized (sorted, non-empty) query parameters.
+    """
+    params = urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values if value
+    ))
+    digest = hashlib.md5(
+        f'{request.get_host()}{request.path}?{params}'.encode()
+    ).hexdigest()
+    return RESPONSE_CACHE_KEY.format(
+        version=get_content_version(),
+        digest=digest
+    )
+
+
+class AnonymousResponseCacheMixin:
+    """Caches list and retrieve responses of a viewset for anonymous users,
+    whose representation does not depend on a user. Authenticated requests
+    bypass the cache. Entries are keyed on the content version, so they are
+    never purged explicitly, and expire after RESPONSE_CACHE_TIMEOUT, or
+    the timeout of get_response_cache_timeout. Concurrent misses of the same
+    key are computed once.
+    """
+    def get_response_cache_timeout(self, request: Request) -> int:
+        return settings.RESPONSE_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cached_response(self,
+                            handler: Callable,
+                            request: Request,
+                            *args, **kwargs) -> Response:
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        key = get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        def compute():
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(
+                    key,
+                    response.data,
+                    self.get_response_cache_timeout(request)
+                )
+            return response.status_code, response.data
+
+        status_code, data = single_flight(key, compute)
+        return Response(data, status=status_code)
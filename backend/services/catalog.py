@@ -0,0 +1,73 @@
+from recipes.models import Ingredient
+
+from django.conf import settings
+from django.core.cache import cache
+
+import gzip
+import hashlib
+from typing import NamedTuple
+
+import orjson
+
+
+SNAPSHOT_CACHE_KEY = 'ingredients:snapshot'
+
+
+class CatalogSnapshot(NamedTuple):
+    version: str
+    content: bytes
+
+
+def build_ingredient_snapshot() -> CatalogSnapshot:
+    """Returns the whole ingredient catalog as gzip-compressed JSON along
+    with its version, a digest of the content.
+    """
+    payload = orjson.dumps(list(
+        Ingredient.objects
+        .order_by('id')
+        .values('id', 'name', 'measurement_unit')
+    ))
+    return CatalogSnapshot(
+        version=hashlib.sha256(payload).hexdigest()[:16],
+        content=gzip.compress(payload, compresslevel=9, mtime=0)
+    )
+
+
+def get_ingredient_snapshot() -> CatalogSnapshot:
+    """Returns the cached catalog snapshot, which is regenerated after
+    an ingredient is changed or INGREDIENT_SNAPSHOT_TIMEOUT.
+    """
+    snapshot = cache.get(SNAPSHOT_CACHE_KEY)
+    if snapshot is None:
+        snapshot = build_ingredient_snapshot()
+        cache.set(
+            SNAPSHOT_CACHE_KEY,
+            tuple(snapshot),
+            timeout=settings.INGREDIENT_SNAPSHOT_TIMEOUT
+        )
+        return snapshot
+    return CatalogSnapshot(*snapshot)
+
+
+def invalidate_ingredient_snapshot() -> None:
+    cache.delete(SNAPSHOT_CACHE_KEY)
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows the encoding, by name or
+    by '*', with a non-zero quality.
+    """
+    qualities = {}
+    for item in accept_encoding.lower().split(','):
+        name, *params = (part.strip() for part in item.split(';'))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name] = quality
+    return qualities.get(encoding, qualities.get('*', 0.0)) > 0
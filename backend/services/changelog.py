@@ -0,0 +1,95 @@
+from recipes.models import ChangeLogEntry
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from datetime import timedelta
+from typing import Iterable, List, Optional, Tuple
+
+
+CHANGE_FIELDS = ('id', 'kind', 'action', 'object_id')
+
+
+def log_change(kind: str,
+               action: str,
+               object_id: int,
+               user_id: Optional[int] = None) -> None:
+    """Appends a change to the log, a change with <user_id> is visible
+    only to that user. Must be called in the transaction of the change,
+    at least once after its last write: the entry commits together with
+    the change, and its id is taken right before the commit, so
+    CHANGE_LOG_SETTLE_SECONDS only has to cover the commit itself.
+    """
+    ChangeLogEntry.objects.create(
+        kind=kind,
+        action=action,
+        object_id=object_id,
+        user_id=user_id
+    )
+
+
+def get_last_change_id() -> int:
+    return (
+        ChangeLogEntry.objects
+        .order_by('-id')
+        .values_list('id', flat=True)
+        .first()
+    ) or 0
+
+
+def get_changes(since: int,
+                limit: int,
+                user_id: Optional[int] = None,
+                kinds: Iterable[str] = ()) -> Tuple[List[dict], bool]:
+    """Returns changes after the <since> cursor in the order they were
+    logged, the public ones and those of the user, and whether there are
+    more. Ids are taken in the order rows are inserted, not committed, so
+    changes newer than CHANGE_LOG_SETTLE_SECONDS are held back, together
+    with all after them, until transactions, which may still commit
+    a smaller id, are over.
+    """
+    visible = Q(user__isnull=True)
+    if user_id is not None:
+        visible |= Q(user_id=user_id)
+    entries = ChangeLogEntry.objects.filter(visible, id__gt=since)
+    kinds = list(kinds)
+    if kinds:
+        entries = entries.filter(kind__in=kinds)
+
+    settled_before = timezone.now() - timedelta(
+        seconds=settings.CHANGE_LOG_SETTLE_SECONDS
+    )
+    changes = []
+    for change in (
+        entries.order_by('id').values(*CHANGE_FIELDS, 'created')[:limit + 1]
+    ):
+        if change.pop('created') >= settled_before:
+            return changes, False
+        changes.append(change)
+    return changes[:limit], len(changes) > limit
+
+
+def compact_change_log() -> int:
+    """Deletes the entries older than CHANGE_LOG_RETENTION_DAYS, which are
+    superseded by a later entry of the same object and user, and returns
+    their number. The log keeps the last change of every object, so a client
+    with a cursor of any age still gets the current state of what changed.
+    """
+    newer = ChangeLogEntry.objects.filter(
+        kind=OuterRef('kind'),
+        object_id=OuterRef('object_id'),
+        id__gt=OuterRef('id')
+    )
+    expired = ChangeLogEntry.objects.filter(
+        created__lt=timezone.now() - timedelta(
+            days=settings.CHANGE_LOG_RETENTION_DAYS
+        )
+    )
+    public, _ = expired.filter(user__isnull=True).filter(
+        Exists(newer.filter(user__isnull=True))
+    ).delete()
+    private, _ = expired.filter(user__isnull=False).filter(
+        Exists(newer.filter(user_id=OuterRef('user_id')))
+    ).delete()
+    return public + private
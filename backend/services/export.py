@@ -0,0 +1,138 @@
+from recipes.models import Recipe, RecipeIngredient, RecipeTag
+
+import csv
+import io
+from typing import Callable, Dict, Iterator, List
+
+import orjson
+
+
+EXPORT_CHUNK_SIZE = 2000
+RECIPE_EXPORT_FIELDS = (
+    'id',
+    'author_id',
+    'name',
+    'image',
+    'text',
+    'cooking_time',
+    'creation_date',
+)
+CSV_EXPORT_FIELDS = RECIPE_EXPORT_FIELDS + ('tags', 'ingredients')
+
+
+def _attach_tags_and_ingredients(chunk: List[dict]) -> List[dict]:
+    recipes = {recipe['id']: recipe for recipe in chunk}
+    for recipe in chunk:
+        recipe['tags'] = []
+        recipe['ingredients'] = []
+
+    tags = (
+        RecipeTag.objects
+        .filter(recipe_id__in=recipes)
+        .order_by('id')
+        .values_list('recipe_id', 'tag__slug')
+    )
+    for recipe_id, slug in tags:
+        recipes[recipe_id]['tags'].append(slug)
+
+    ingredients = (
+        RecipeIngredient.objects
+        .filter(recipe_id__in=recipes)
+        .order_by('id')
+        .values_list(
+            'recipe_id',
+            'ingredient_id',
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount'
+        )
+    )
+    for recipe_id, id, name, measurement_unit, amount in ingredients:
+        recipes[recipe_id]['ingredients'].append({
+            'id': id,
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        })
+
+    return chunk
+
+
+def iter_recipe_chunks(after: int = 0,
+                       chunk_size: int = EXPORT_CHUNK_SIZE) \
+        -> Iterator[List[dict]]:
+    """Yields chunks of recipes with id greater than <after>, ordered by id,
+    with their tags and ingredients. Recipes are read through a server-side
+    cursor and related rows are fetched per chunk, so memory stays constant.
+    """
+    recipes = (
+        Recipe.objects
+        .filter(id__gt=after)
+        .order_by('id')
+        .values(*RECIPE_EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    chunk = []
+    for recipe in recipes:
+        chunk.append(recipe)
+        if len(chunk) == chunk_size:
+            yield _attach_tags_and_ingredients(chunk)
+            chunk = []
+    if chunk:
+        yield _attach_tags_and_ingredients(chunk)
+
+
+def iter_ndjson(chunks: Iterator[List[dict]],
+                header: bool = True) -> Iterator[bytes]:
+    """One JSON object per line, a chunk per yielded piece.
+    NDJSON has no header, <header> is accepted for the same signature
+    as of the other exporters.
+    """
+    for chunk in chunks:
+        yield b''.join(
+            orjson.dumps(recipe, option=orjson.OPT_APPEND_NEWLINE)
+            for recipe in chunk
+        )
+
+
+def iter_csv(chunks: Iterator[List[dict]],
+             header: bool = True) -> Iterator[str]:
+    """One row per recipe: tags as comma-separated slugs,
+    ingredients as a JSON array. The header row is left out with
+    <header> = False, when a resumed export is appended to the first part.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_EXPORT_FIELDS)
+
+    for chunk in chunks:
+        for recipe in chunk:
+            writer.writerow([
+                recipe['id'],
+                recipe['author_id'],
+                recipe['name'],
+                recipe['image'],
+                recipe['text'],
+                recipe['cooking_time'],
+                recipe['creation_date'].isoformat(),
+                ','.join(recipe['tags']),
+                orjson.dumps(recipe['ingredients']).decode(),
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORTERS: Dict[str, Callable] = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
@@ -0,0 +1,152 @@
+from users.models import UserFeedEntry, UserSubscription
+from recipes.models import Recipe
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from typing import Iterable, List, Optional, Set
+
+
+POPULAR_AUTHOR_CACHE_KEY = 'feed:popular-author:{}'
+POPULAR_AUTHOR_CACHE_TIMEOUT = 60 * 60
+FAN_OUT_BATCH_SIZE = 1000
+
+
+def get_popular_author_ids(author_ids: Iterable[int]) -> Set[int]:
+    """Returns ids of the given authors, whose followers number exceeds
+    FEED_FANOUT_FOLLOWERS_LIMIT. Recipes of such authors are not fanned out,
+    but pulled into a feed at read time. Results are cached per author.
+    """
+    author_ids = set(author_ids)
+    if not author_ids:
+        return set()
+
+    keys = {
+        POPULAR_AUTHOR_CACHE_KEY.format(author_id): author_id
+        for author_id in author_ids
+    }
+    cached = cache.get_many(keys)
+    popular = {keys[key] for key, value in cached.items() if value}
+    missing = {keys[key] for key in keys if key not in cached}
+
+    if missing:
+        counted = set(
+            UserSubscription.objects
+            .filter(author_id__in=missing)
+            .values('author_id')
+            .annotate(followers_count=Count('id'))
+            .filter(followers_count__gt=settings.FEED_FANOUT_FOLLOWERS_LIMIT)
+            .values_list('author_id', flat=True)
+        )
+        cache.set_many(
+            {
+                POPULAR_AUTHOR_CACHE_KEY.format(author_id):
+                    author_id in counted
+                for author_id in missing
+            },
+            timeout=POPULAR_AUTHOR_CACHE_TIMEOUT
+        )
+        popular |= counted
+
+    return popular
+
+
+def fan_out_recipe(recipe_id: int) -> None:
+    """Writes a recipe into the timelines of all followers of its author.
+    Does nothing for popular authors, whose recipes are pulled on read.
+    """
+    recipe = Recipe.objects.filter(id=recipe_id).values('author_id').first()
+    if recipe is None or get_popular_author_ids([recipe['author_id']]):
+        return
+
+    follower_ids = (
+        UserSubscription.objects
+        .filter(author_id=recipe['author_id'])
+        .values_list('follower_id', flat=True)
+        .iterator(chunk_size=FAN_OUT_BATCH_SIZE)
+    )
+
+    batch = []
+    for follower_id in follower_ids:
+        batch.append(UserFeedEntry(
+            follower_id=follower_id,
+            author_id=recipe['author_id'],
+            recipe_id=recipe_id
+        ))
+        if len(batch) == FAN_OUT_BATCH_SIZE:
+            UserFeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    UserFeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_feed(follower_id: int, author_id: int) -> None:
+    """Writes the latest recipes of a just subscribed author into
+    the follower's timeline.
+    """
+    if get_popular_author_ids([author_id]):
+        return
+
+    recipe_ids = (
+        Recipe.objects
+        .filter(author_id=author_id)
+        .order_by('-id')
+        .values_list('id', flat=True)[:settings.FEED_BACKFILL_RECIPES]
+    )
+    UserFeedEntry.objects.bulk_create(
+        [
+            UserFeedEntry(
+                follower_id=follower_id,
+                author_id=author_id,
+                recipe_id=recipe_id
+            ) for recipe_id in recipe_ids
+        ],
+        ignore_conflicts=True
+    )
+
+
+def clear_feed(follower_id: int, author_id: int) -> None:
+    """Removes recipes of an unsubscribed author from the follower's timeline.
+    """
+    UserFeedEntry.objects.filter(
+        follower_id=follower_id,
+        author_id=author_id
+    ).delete()
+
+
+def get_feed_recipe_ids(follower_id: int,
+                        before: Optional[int],
+                        limit: int,
+                        followed_author_ids: Optional[Iterable[int]] = None) \
+        -> List[int]:
+    """Returns up to <limit> recipe ids of the follower's feed, newest first,
+    which are less than <before> (keyset). Fanned out timeline entries are
+    merged with recipes pulled from followed popular authors. Followed authors
+    are fetched, unless <followed_author_ids> are given.
+    """
+    entries = UserFeedEntry.objects.filter(follower_id=follower_id)
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+
+    recipe_ids = set(
+        entries.order_by('-recipe_id')
+        .values_list('recipe_id', flat=True)[:limit]
+    )
+
+    if followed_author_ids is None:
+        followed_author_ids = (
+            UserSubscription.objects
+            .filter(follower_id=follower_id)
+            .values_list('author_id', flat=True)
+        )
+    popular_author_ids = get_popular_author_ids(followed_author_ids)
+    if popular_author_ids:
+        pulled = Recipe.objects.filter(author_id__in=popular_author_ids)
+        if before is not None:
+            pulled = pulled.filter(id__lt=before)
+        recipe_ids.update(
+            pulled.order_by('-id').values_list('id', flat=True)[:limit]
+        )
+
+    return sorted(recipe_ids, reverse=True)[:limit]
@@ -0,0 +1,84 @@
+from rest_framework import serializers
+from rest_framework.request import Request
+
+from typing import Iterable, Optional, Set, Tuple
+
+
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+
+def parse_field_names(values: Iterable[str]) -> Set[str]:
+    """Accepts values of a repeated, comma-separated query parameter
+    and returns a set of field names.
+    """
+    return {
+        name.strip()
+        for value in values
+        for name in value.split(',') if name.strip()
+    }
+
+
+class SparseFieldsetMixin:
+    """Lets a client choose representation fields: <fields> replaces
+    the default fields, <expand> adds fields to them. The default fields are
+    <compact_fields> for a list and all <representation_fields> otherwise.
+
+    Every field is built by get_<field> method or read from the instance
+    attribute, only if it is requested, so unrequested blocks are never
+    computed. A nested serializer gets its fields through 'fieldset' context
+    key (None means the defaults) instead of the query parameters.
+    """
+    representation_fields: Tuple[str, ...] = ()
+    compact_fields: Optional[Tuple[str, ...]] = None
+
+    @classmethod
+    def get_requested_fields(cls,
+                             request: Optional[Request],
+                             many: bool = False) -> Tuple[str, ...]:
+        default = (
+            cls.compact_fields
+            if many and cls.compact_fields is not None
+            else cls.representation_fields
+        )
+        if request is None:
+            return default
+
+        requested = parse_field_names(
+            request.query_params.getlist(FIELDS_QUERY_PARAM)
+        ) or set(default)
+        requested |= parse_field_names(
+            request.query_params.getlist(EXPAND_QUERY_PARAM)
+        )
+        return tuple(
+            field for field in cls.representation_fields if field in requested
+        )
+
+    def get_representation_fields(self) -> Tuple[str, ...]:
+        if not hasattr(self, '_representation_fields'):
+            many = isinstance(self.parent, serializers.ListSerializer)
+            if 'fieldset' in self.context:
+                fieldset = self.context['fieldset']
+                self._representation_fields = (
+                    self.get_requested_fields(None, many=many)
+                    if fieldset is None
+                    else tuple(
+                        field for field in self.representation_fields
+                        if field in fieldset
+                    )
+                )
+            else:
+                self._representation_fields = self.get_requested_fields(
+                    self.context.get('request'),
+                    many=many
+                )
+        return self._representation_fields
+
+    def to_representation(self, instance) -> dict:
+        representation = {}
+        for field in self.get_representation_fields():
+            method = getattr(self, f'get_{field}', None)
+            representation[field] = (
+                method(instance) if method else getattr(instance, field)
+            )
+        return representation
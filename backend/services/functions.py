@@ -1,17 +1,43 @@
-from users.models import UserSubscription, UserCart
-from recipes.models import Recipe, Ingredient, RecipeIngredient
+from users.models import (
+    UserCart,
+    UserCartRecipe,
+    UserRecipe,
+    UserSubscription,
+)
+from recipes.models import (
+    ChangeLogEntry,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+)
 from users.models import UserCart
+from services.authentication import revoke_user_tokens
+from services.cache import bump_content_version
+from services.changelog import log_change
+from services.feed import fan_out_recipe, backfill_feed, clear_feed
+from services.rows import (
+    forget_followed_author_ids,
+    invalidate_recipe_representations,
+    is_subscribed_author,
+)
+from services.indexes import refresh_recipe_indexes
+from services.search import search_recipes
+from services.similarity import refresh_similar_recipes
+from services.tasks import run_in_background
+from services.trending import record_activity
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password, check_password
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Sum, QuerySet
+from django.db import transaction
+from django.db.models import Prefetch, Sum, QuerySet
+from django.utils import timezone
 
 from rest_framework import viewsets, serializers
 from rest_framework.request import Request
 from rest_framework.permissions import SAFE_METHODS
 
-from typing import Union, List
+from typing import Iterable, Union, List
 
 
 User = get_user_model()
@@ -20,9 +46,10 @@ User = get_user_model()
 def get_recipe_queryset(self: viewsets.ModelViewSet) \
     -> Union[QuerySet, List[Recipe]]:
     """Returns a recipe queryset. It is assumed, that only authorized user
-    can use query parameters (filters) in GET request.
+    can use query parameters (filters) in GET request. Full-text search
+    by <search> parameter is available for everyone and ranks the results.
     """
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.defer('search_vector')
 
     if self.request.method not in SAFE_METHODS:
         return queryset
@@ -33,13 +60,14 @@ def get_recipe_queryset(self: viewsets.ModelViewSet) \
         'is_in_shopping_cart'
     )
     slugs = self.request.query_params.getlist('tags')
+    search_query = self.request.query_params.get('search')
 
     if ((not is_favorited 
          and not is_in_shopping_cart
          and not slugs
          and not author_id
         ) or not self.request.user.is_authenticated):
-        return queryset
+        return search_recipes(queryset, search_query)
 
     # Here is used the concept of queryset union (A | B | C).
     # Do not confuse "|" sign with bitwise OR operator.
@@ -53,13 +81,34 @@ def get_recipe_queryset(self: viewsets.ModelViewSet) \
 
        | Recipe.objects.filter(tags__slug__in=slugs)
        if slugs else Recipe.objects.none()
-    ).distinct()
+    ).distinct().defer('search_vector')
 
     try:
-        return (queryset.filter(author__id=int(author_id))
-                if author_id else queryset)
+        queryset = (queryset.filter(author__id=int(author_id))
+                    if author_id else queryset)
     except ValueError as e:
-        return queryset
+        pass
+
+    return search_recipes(queryset, search_query)
+
+
+def prefetch_recipe_queryset(queryset: QuerySet,
+                             fields: Iterable[str]) -> QuerySet:
+    """Fetches related objects of the requested representation fields
+    in bulk and does not load the ones, which are not requested.
+    """
+    if 'text' not in fields:
+        queryset = queryset.defer('text')
+    if 'author' in fields:
+        queryset = queryset.select_related('author')
+    if 'tags' in fields:
+        queryset = queryset.prefetch_related('tags')
+    if 'ingredients' in fields:
+        queryset = queryset.prefetch_related(Prefetch(
+            'recipeingredient_set',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
+    return queryset
 
 
 def add_ingredients_to_recipe(recipe: Recipe, validated_data: dict) -> None:
@@ -75,8 +124,11 @@ def add_ingredients_to_recipe(recipe: Recipe, validated_data: dict) -> None:
     ])
 
 
+@transaction.atomic
 def create_recipe(validated_data: dict, request: Request) -> Recipe:
-    """Creates a recipe and adds the given tags and ingredients to it.
+    """Creates a recipe and adds the given tags and ingredients to it
+    in one transaction, so the recipe is never read, and cached, without
+    them.
     """
     recipe = Recipe.objects.create(
         author=request.user,
@@ -86,14 +138,23 @@ def create_recipe(validated_data: dict, request: Request) -> Recipe:
         cooking_time=validated_data['cooking_time']
     )
 
-    recipe.tags.add(*validated_data['tags'])
     add_ingredients_to_recipe(recipe=recipe, validated_data=validated_data)
+    # Tags go last: unlike bulk created ingredients, they log the change
+    # after the last write.
+    recipe.tags.add(*validated_data['tags'])
+    bump_content_version()
+    run_in_background(fan_out_recipe, recipe_id=recipe.id)
+    run_in_background(refresh_similar_recipes, recipe_id=recipe.id)
+    run_in_background(refresh_recipe_indexes, recipe_id=recipe.id)
     return recipe
 
 
+@transaction.atomic
 def update_recipe(instance: Recipe, validated_data: dict) -> Recipe:
-    """Updates a recipe with specified in validated_data fields.
+    """Updates a recipe with specified in validated_data fields
+    in one transaction.
     """
+    invalidate_recipe_representations([(instance.id, instance.creation_date)])
     instance.name = validated_data.get('name', instance.name)
     instance.image = validated_data.get('image', instance.image)
     instance.text = validated_data.get('text', instance.text)
@@ -114,21 +175,21 @@ def update_recipe(instance: Recipe, validated_data: dict) -> Recipe:
         )
 
     instance.save()
+    if validated_data.get('tags') or validated_data.get('ingredients'):
+        run_in_background(refresh_similar_recipes, recipe_id=instance.id)
+    run_in_background(refresh_recipe_indexes, recipe_id=instance.id)
     return instance
 
 
 def is_subscribed(user: User, request: Request) -> bool:
     """Returns True if request.user is subscribed on requested user,
     otherwise False. The same user is considered to be subscribed on itself.
-    Returns False for unauthorized user.
+    Returns False for unauthorized user. Subscriptions are fetched once
+    per request, so a list of users is checked without a query per user.
     """
-    try:
-        return (request.user.email == user.email
-            or UserSubscription.objects.filter(
-                   author=user,
-                   follower=request.user).exists())
-    except AttributeError as e:
+    if request is None:
         return False
+    return is_subscribed_author(request, user.id)
 
 
 def is_favorited(recipe: Recipe, request: Request) -> bool:
@@ -211,52 +272,125 @@ def save_new_user_password(user: User, password: str) -> User:
     """Sets password to a particular user.
     """
     user.set_password(password)
-    user.save()
+    user.save(update_fields=('password',))
+    revoke_user_tokens(user.id)
     return user
 
 
+@transaction.atomic
 def create_subscription(request: Request, id: int) -> User:
     """Creates subscription between two authorized users.
     """
     requested_user = User.objects.get(id=id)
     request.user.subscriptions.add(requested_user)
+    forget_followed_author_ids(request)
+    log_change(
+        ChangeLogEntry.SUBSCRIPTION,
+        ChangeLogEntry.CREATED,
+        requested_user.id,
+        user_id=request.user.id
+    )
+    run_in_background(
+        backfill_feed,
+        follower_id=request.user.id,
+        author_id=requested_user.id
+    )
     return requested_user
 
 
+@transaction.atomic
 def destroy_subscription(request: Request, id: int) -> None:
     """Destroys subscription between two authorized users.
     """
     User.objects.get(id=request.user.id).subscriptions.remove(
         User.objects.get(id=id)
     )
+    forget_followed_author_ids(request)
+    clear_feed(follower_id=request.user.id, author_id=id)
+    log_change(
+        ChangeLogEntry.SUBSCRIPTION,
+        ChangeLogEntry.DELETED,
+        id,
+        user_id=request.user.id
+    )
 
 
+@transaction.atomic
 def create_favorite_recipe(request: Request, id: int) -> Recipe:
     """Creates a favorite recipe for a particular user.
     """
     requested_recipe = Recipe.objects.get(id=id)
     request.user.favorites.add(requested_recipe)
+    record_activity(requested_recipe.id, favorites=1)
+    log_change(
+        ChangeLogEntry.FAVORITE,
+        ChangeLogEntry.CREATED,
+        requested_recipe.id,
+        user_id=request.user.id
+    )
     return requested_recipe
 
 
+@transaction.atomic
 def destroy_favorite_recipe(request: Request, id: int) -> None:
     """Destroys a favorite recipe for a particular user.
     """
+    added_date = (
+        UserRecipe.objects
+        .filter(user_id=request.user.id, recipe_id=id)
+        .values_list('added_date', flat=True)
+        .first()
+    )
     request.user.favorites.remove(Recipe.objects.get(id=id))
+    if added_date is not None:
+        record_activity(
+            id, favorites=-1, day=timezone.localdate(added_date)
+        )
+    log_change(
+        ChangeLogEntry.FAVORITE,
+        ChangeLogEntry.DELETED,
+        id,
+        user_id=request.user.id
+    )
 
 
+@transaction.atomic
 def add_recipe_into_user_shopping_cart(request: Request, id: int) -> None:
     """Adds a recipe into a shopping cart of a particular user.
     """
     user_shopping_cart = UserCart.objects.get(user=request.user)
     user_shopping_cart.recipes.add(Recipe.objects.get(id=id))
+    record_activity(id, shopping_carts=1)
+    log_change(
+        ChangeLogEntry.SHOPPING_CART,
+        ChangeLogEntry.CREATED,
+        id,
+        user_id=request.user.id
+    )
 
 
+@transaction.atomic
 def destroy_recipe_from_user_shopping_cart(request: Request, id: int) -> None:
     """Destroys a recipe from a shopping cart of a particular user.
     """
     user_shopping_cart = UserCart.objects.get(user=request.user)
+    added_date = (
+        UserCartRecipe.objects
+        .filter(usercart=user_shopping_cart, recipe_id=id)
+        .values_list('added_date', flat=True)
+        .first()
+    )
     user_shopping_cart.recipes.remove(Recipe.objects.get(id=id))
+    if added_date is not None:
+        record_activity(
+            id, shopping_carts=-1, day=timezone.localdate(added_date)
+        )
+    log_change(
+        ChangeLogEntry.SHOPPING_CART,
+        ChangeLogEntry.DELETED,
+        id,
+        user_id=request.user.id
+    )
 
 
 def validate_subscription(request: Request, id: int) -> None:
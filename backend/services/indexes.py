@@ -0,0 +1,526 @@
+from recipes.models import (
+    ChangeLogEntry,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    Tag,
+)
+from services.changelog import get_changes, get_last_change_id
+
+from django.db import connection
+
+import itertools
+import logging
+import threading
+import time
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Indexes are rebuilt from the database this often. Writes of this process
+# are applied in place, writes of other processes are read from the change
+# log every RECIPE_INDEX_SYNC_INTERVAL seconds, up to RECIPE_INDEX_SYNC_LIMIT
+# changes, a longer backlog also triggers a rebuild.
+RECIPE_INDEX_TTL = 60 * 10
+RECIPE_INDEX_SYNC_INTERVAL = 1
+RECIPE_INDEX_SYNC_LIMIT = 100
+
+EMPTY_POSTING = np.empty(0, dtype=np.int64)
+
+# Upper bounds of the cooking time buckets of recipe facets, in minutes.
+# The last bucket is open-ended.
+COOKING_TIME_BUCKETS = (15, 30, 60, 120)
+
+
+def fetch_columns(queryset, *fields) -> np.ndarray:
+    """Fetches integer columns into an (n, columns) array without building
+    a list of tuples.
+    """
+    values = np.fromiter(
+        itertools.chain.from_iterable(
+            queryset.values_list(*fields).iterator(chunk_size=10000)
+        ),
+        dtype=np.int64
+    )
+    return values.reshape(-1, len(fields))
+
+
+def build_postings(pairs: np.ndarray) -> Dict[int, np.ndarray]:
+    """Accepts (recipe id, key) pairs and returns a sorted array of recipe
+    ids per key. Sorted id arrays serve as the bitmaps of the indexes:
+    they are compact for sparse sets, are intersected with np.isin
+    and counted over with np.unique.
+    """
+    if not len(pairs):
+        return {}
+    pairs = pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))]
+    keys, starts = np.unique(pairs[:, 1], return_index=True)
+    return dict(zip(keys.tolist(), np.split(pairs[:, 0], starts[1:])))
+
+
+def add_to_postings(postings: Dict[int, np.ndarray],
+                    recipe_id: int,
+                    keys: Iterable[int]) -> None:
+    for key in keys:
+        posting = postings.get(key, EMPTY_POSTING)
+        postings[key] = np.insert(
+            posting, np.searchsorted(posting, recipe_id), recipe_id
+        )
+
+
+def remove_from_postings(postings: Dict[int, np.ndarray],
+                         recipe_id: int) -> None:
+    for key, posting in list(postings.items()):
+        position = np.searchsorted(posting, recipe_id)
+        if position < len(posting) and posting[position] == recipe_id:
+            postings[key] = np.delete(posting, position)
+
+
+class RecipeIndex:
+    """In-process index over recipes. Keeps recipe ids in ascending order
+    with their cooking times and authors, and a posting of recipe ids per
+    tag, which subclasses extend with their own columns and postings.
+
+    An index is built from the database on creation and then kept in sync
+    with the change log, see RecipeIndexStore for its lifecycle.
+    """
+    def __init__(self):
+        self.change_cursor = get_last_change_id()
+        self.build()
+        self.built_at = self.synced_at = time.monotonic()
+        self.backlogged = False
+
+    def build(self) -> None:
+        recipes = fetch_columns(
+            Recipe.objects.order_by('id'), 'id', 'cooking_time', 'author_id'
+        )
+        self.recipe_ids = recipes[:, 0]
+        self.cooking_times = recipes[:, 1]
+        self.author_ids = recipes[:, 2]
+        self.tag_postings = build_postings(
+            fetch_columns(RecipeTag.objects.all(), 'recipe_id', 'tag_id')
+        )
+
+    def is_expired(self) -> bool:
+        return (self.backlogged
+                or time.monotonic() - self.built_at > RECIPE_INDEX_TTL)
+
+    def sync(self) -> bool:
+        """Applies up to RECIPE_INDEX_SYNC_LIMIT recipe changes logged since
+        the build or the last sync and returns whether there are more.
+        """
+        changes, has_more = get_changes(
+            since=self.change_cursor,
+            limit=RECIPE_INDEX_SYNC_LIMIT,
+            kinds=(ChangeLogEntry.RECIPE,)
+        )
+        for recipe_id in dict.fromkeys(
+            change['object_id'] for change in changes
+        ):
+            self.apply_recipe(load_index_recipe(recipe_id), recipe_id)
+        if changes:
+            self.change_cursor = changes[-1]['id']
+        self.synced_at = time.monotonic()
+        return has_more
+
+    def remove_recipe(self, recipe_id: int) -> None:
+        position = np.searchsorted(self.recipe_ids, recipe_id)
+        if (position < len(self.recipe_ids)
+                and self.recipe_ids[position] == recipe_id):
+            self.recipe_ids = np.delete(self.recipe_ids, position)
+            self.cooking_times = np.delete(self.cooking_times, position)
+            self.author_ids = np.delete(self.author_ids, position)
+        remove_from_postings(self.tag_postings, recipe_id)
+
+    def add_recipe(self, recipe: dict) -> None:
+        """Adds a recipe from the values of <Recipe>, with its <tag_ids>
+        and <ingredient_ids>.
+        """
+        position = np.searchsorted(self.recipe_ids, recipe['id'])
+        self.recipe_ids = np.insert(self.recipe_ids, position, recipe['id'])
+        self.cooking_times = np.insert(
+            self.cooking_times, position, recipe['cooking_time']
+        )
+        self.author_ids = np.insert(
+            self.author_ids, position, recipe['author_id']
+        )
+        add_to_postings(self.tag_postings, recipe['id'], recipe['tag_ids'])
+
+    def apply_recipe(self, recipe: Optional[dict], recipe_id: int) -> None:
+        """Replaces a recipe with its current state, or removes it,
+        if it does not exist anymore.
+        """
+        self.remove_recipe(recipe_id)
+        if recipe is not None:
+            self.add_recipe(recipe)
+
+    def get_positions(self, recipe_ids: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.recipe_ids, recipe_ids)
+
+    def get_mask(self, recipe_ids: np.ndarray) -> np.ndarray:
+        """Returns a boolean mask over the recipes of the index, set for
+        the given ids, which are in the index.
+        """
+        mask = np.zeros(len(self.recipe_ids), dtype=bool)
+        positions = self.get_positions(recipe_ids)
+        found = positions < len(self.recipe_ids)
+        found[found] = self.recipe_ids[positions[found]] == recipe_ids[found]
+        mask[positions[found]] = True
+        return mask
+
+    def filter_recipes(self,
+                       recipe_ids: np.ndarray,
+                       tag_ids: Iterable[int] = (),
+                       max_cooking_time: Optional[int] = None) -> np.ndarray:
+        """Keeps the recipes having any of the tags and cooking not longer
+        than <max_cooking_time>.
+        """
+        tag_ids = list(tag_ids)
+        if tag_ids:
+            recipe_ids = recipe_ids[np.isin(
+                recipe_ids,
+                np.concatenate([
+                    self.tag_postings.get(tag_id, EMPTY_POSTING)
+                    for tag_id in tag_ids
+                ])
+            )]
+        if max_cooking_time is not None:
+            recipe_ids = recipe_ids[
+                self.cooking_times[self.get_positions(recipe_ids)]
+                <= max_cooking_time
+            ]
+        return recipe_ids
+
+
+class PantryIndex(RecipeIndex):
+    """Inverted index from an ingredient to the recipes it is used in,
+    for ranking recipes by the ingredients a user has at hand.
+    """
+    def build(self) -> None:
+        super().build()
+        ingredients = fetch_columns(
+            RecipeIngredient.objects.all(), 'recipe_id', 'ingredient_id'
+        )
+        self.ingredient_postings = build_postings(ingredients)
+        self.ingredient_counts = np.bincount(
+            self.get_positions(ingredients[:, 0]),
+            minlength=len(self.recipe_ids)
+        )
+
+    def remove_recipe(self, recipe_id: int) -> None:
+        position = np.searchsorted(self.recipe_ids, recipe_id)
+        if (position < len(self.recipe_ids)
+                and self.recipe_ids[position] == recipe_id):
+            self.ingredient_counts = np.delete(
+                self.ingredient_counts, position
+            )
+        super().remove_recipe(recipe_id)
+        remove_from_postings(self.ingredient_postings, recipe_id)
+
+    def add_recipe(self, recipe: dict) -> None:
+        super().add_recipe(recipe)
+        self.ingredient_counts = np.insert(
+            self.ingredient_counts,
+            self.get_positions(recipe['id']),
+            len(recipe['ingredient_ids'])
+        )
+        add_to_postings(
+            self.ingredient_postings, recipe['id'], recipe['ingredient_ids']
+        )
+
+    def search_pantry(self,
+                      ingredient_ids: Iterable[int],
+                      tag_ids: Iterable[int] = (),
+                      max_cooking_time: Optional[int] = None,
+                      max_missing: Optional[int] = None) \
+            -> List[Tuple[int, int, int]]:
+        """Returns (recipe id, matched, missing) of the recipes using any of
+        the ingredients: the most matched ingredients first, then the fewest
+        missing ones, then the newest.
+        """
+        postings = [
+            self.ingredient_postings.get(ingredient_id, EMPTY_POSTING)
+            for ingredient_id in set(ingredient_ids)
+        ]
+        if not postings:
+            return []
+
+        recipe_ids, matched = np.unique(
+            np.concatenate(postings), return_counts=True
+        )
+        keep = np.isin(
+            recipe_ids,
+            self.filter_recipes(recipe_ids, tag_ids, max_cooking_time)
+        )
+        recipe_ids, matched = recipe_ids[keep], matched[keep]
+        missing = (
+            self.ingredient_counts[self.get_positions(recipe_ids)] - matched
+        )
+
+        if max_missing is not None:
+            keep = missing <= max_missing
+            recipe_ids, matched, missing = (
+                recipe_ids[keep], matched[keep], missing[keep]
+            )
+        order = np.lexsort((-recipe_ids, missing, -matched))
+        return list(zip(
+            recipe_ids[order].tolist(),
+            matched[order].tolist(),
+            missing[order].tolist()
+        ))
+
+
+class FacetResult(NamedTuple):
+    recipe_ids: List[int]
+    tag_counts: Dict[int, int]
+    cooking_time_counts: List[int]
+
+
+class FacetIndex(RecipeIndex):
+    """Evaluates recipe browser filters as operations on boolean masks over
+    the recipes of the index and counts facets of the result in the same
+    pass: per tag and per cooking time bucket (see COOKING_TIME_BUCKETS).
+    The mask of every tag is kept along with its posting, so queries only
+    combine masks.
+    """
+    def build(self) -> None:
+        super().build()
+        self.cooking_time_buckets = get_cooking_time_buckets(
+            self.cooking_times
+        )
+        self.tag_masks = {
+            tag_id: self.get_mask(posting)
+            for tag_id, posting in self.tag_postings.items()
+        }
+
+    def remove_recipe(self, recipe_id: int) -> None:
+        position = np.searchsorted(self.recipe_ids, recipe_id)
+        if (position < len(self.recipe_ids)
+                and self.recipe_ids[position] == recipe_id):
+            self.cooking_time_buckets = np.delete(
+                self.cooking_time_buckets, position
+            )
+            self.tag_masks = {
+                tag_id: np.delete(mask, position)
+                for tag_id, mask in self.tag_masks.items()
+            }
+        super().remove_recipe(recipe_id)
+
+    def add_recipe(self, recipe: dict) -> None:
+        super().add_recipe(recipe)
+        position = self.get_positions(recipe['id'])
+        self.cooking_time_buckets = np.insert(
+            self.cooking_time_buckets,
+            position,
+            get_cooking_time_buckets(recipe['cooking_time'])
+        )
+        tag_ids = set(recipe['tag_ids'])
+        for tag_id in tag_ids - set(self.tag_masks):
+            self.tag_masks[tag_id] = np.zeros(
+                len(self.recipe_ids) - 1, dtype=bool
+            )
+        self.tag_masks = {
+            tag_id: np.insert(mask, position, tag_id in tag_ids)
+            for tag_id, mask in self.tag_masks.items()
+        }
+
+    def search_facets(self,
+                      tag_ids: Iterable[int] = (),
+                      all_tags: bool = False,
+                      author_id: Optional[int] = None,
+                      recipe_sets: Iterable[np.ndarray] = (),
+                      cooking_time_buckets: Iterable[int] = ()) \
+            -> FacetResult:
+        """Returns ids of the recipes having any (or all) of the tags, by
+        the author, in every one of <recipe_sets>, e.g. the favorites of
+        a user, and in any of the cooking time buckets, newest first.
+
+        A tag count is the number of recipes the result would have with
+        the tag selected too, a bucket count is the number of recipes
+        in the bucket regardless of the selected buckets.
+        """
+        tag_ids = list(tag_ids)
+        cooking_time_buckets = list(cooking_time_buckets)
+        base = np.ones(len(self.recipe_ids), dtype=bool)
+        if author_id is not None:
+            base &= self.author_ids == author_id
+        for recipe_ids in recipe_sets:
+            base &= self.get_mask(recipe_ids)
+
+        tag_masks = self.tag_masks
+        tags = np.ones(len(self.recipe_ids), dtype=bool)
+        if tag_ids:
+            selected = [
+                tag_masks.get(tag_id, np.zeros_like(tags))
+                for tag_id in tag_ids
+            ]
+            tags = (
+                np.logical_and.reduce(selected) if all_tags
+                else np.logical_or.reduce(selected)
+            )
+
+        cooking_time = np.ones(len(self.recipe_ids), dtype=bool)
+        if cooking_time_buckets:
+            cooking_time = np.isin(
+                self.cooking_time_buckets, cooking_time_buckets
+            )
+
+        result = base & tags & cooking_time
+        if all_tags or not tag_ids:
+            tag_counts = {
+                tag_id: int(np.count_nonzero(result & mask))
+                for tag_id, mask in tag_masks.items()
+            }
+        else:
+            tag_counts = {
+                tag_id: int(np.count_nonzero(
+                    base & cooking_time & (tags | mask)
+                ))
+                for tag_id, mask in tag_masks.items()
+            }
+        cooking_time_counts = np.bincount(
+            self.cooking_time_buckets[base & tags],
+            minlength=len(COOKING_TIME_BUCKETS) + 1
+        )
+        return FacetResult(
+            recipe_ids=self.recipe_ids[result][::-1].tolist(),
+            tag_counts=tag_counts,
+            cooking_time_counts=cooking_time_counts.tolist()
+        )
+
+
+def get_cooking_time_buckets(cooking_times: np.ndarray) -> np.ndarray:
+    """Maps cooking times to numbers of COOKING_TIME_BUCKETS."""
+    return np.searchsorted(COOKING_TIME_BUCKETS, cooking_times)
+
+
+class RecipeSearchIndex(PantryIndex, FacetIndex):
+    """The pantry and facet indexes over one copy of the base columns."""
+
+
+class RecipeIndexStore:
+    """Holds the index of the process. The index is built at startup (see
+    <start>), kept in sync with the change log by queries and rebuilt after
+    RECIPE_INDEX_TTL or a longer backlog of changes: the new index is built
+    in a background thread outside the lock and swapped in, while queries
+    are served by the old one. Queries and updates of the current index are
+    serialized by the lock, both take milliseconds.
+    """
+    def __init__(self, index_class: type):
+        self.index_class = index_class
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.index: Optional[RecipeIndex] = None
+
+    def build(self, wait: bool = True) -> None:
+        """Builds a new index and swaps it in. Without <wait> returns
+        at once, if another build is running.
+        """
+        if not self.build_lock.acquire(blocking=wait):
+            return
+        try:
+            if wait and self.index is not None:
+                return
+            index = self.index_class()
+            with self.lock:
+                while index.sync():
+                    pass
+                self.index = index
+        finally:
+            self.build_lock.release()
+
+    def build_in_background(self, wait: bool = True) -> None:
+        def build():
+            try:
+                self.build(wait=wait)
+            except Exception:
+                logger.exception('Failed to build the recipe index.')
+            finally:
+                connection.close()
+
+        threading.Thread(target=build, daemon=True).start()
+
+    def start(self) -> None:
+        """Builds the index in a background thread, queries sent before
+        it is ready wait for it.
+        """
+        self.build_in_background()
+
+    def query(self, function: Callable[[RecipeIndex], T]) -> T:
+        if self.index is None:
+            self.build()
+        with self.lock:
+            index = self.index
+            if (time.monotonic() - index.synced_at
+                    > RECIPE_INDEX_SYNC_INTERVAL and index.sync()):
+                index.backlogged = True
+            if index.is_expired() and not self.build_lock.locked():
+                self.build_in_background(wait=False)
+            return function(index)
+
+    def update_recipe(self, recipe: Optional[dict], recipe_id: int) -> None:
+        """Applies a recipe to the current index, ignored until it is
+        built. An index being built gets the change from the change log.
+        """
+        with self.lock:
+            if self.index is not None:
+                self.index.apply_recipe(recipe, recipe_id)
+
+    def search_pantry(self, *args, **kwargs) -> List[Tuple[int, int, int]]:
+        """See PantryIndex.search_pantry."""
+        return self.query(lambda index: index.search_pantry(*args, **kwargs))
+
+    def search_facets(self, *args, **kwargs) -> FacetResult:
+        """See FacetIndex.search_facets."""
+        return self.query(lambda index: index.search_facets(*args, **kwargs))
+
+
+recipe_index = RecipeIndexStore(RecipeSearchIndex)
+
+
+def load_index_recipe(recipe_id: int) -> Optional[dict]:
+    recipe = (
+        Recipe.objects
+        .filter(id=recipe_id)
+        .values('id', 'cooking_time', 'author_id')
+        .first()
+    )
+    if recipe is not None:
+        recipe['tag_ids'] = list(
+            RecipeTag.objects
+            .filter(recipe_id=recipe_id)
+            .values_list('tag_id', flat=True)
+        )
+        recipe['ingredient_ids'] = list(
+            RecipeIngredient.objects
+            .filter(recipe_id=recipe_id)
+            .values_list('ingredient_id', flat=True)
+        )
+    return recipe
+
+
+def refresh_recipe_indexes(recipe_id: int) -> None:
+    """Applies a created, updated or deleted recipe to the indexes
+    of the process.
+    """
+    recipe_index.update_recipe(load_index_recipe(recipe_id), recipe_id)
+
+
+def get_tag_ids(slugs: Iterable[str]) -> List[int]:
+    return list(
+        Tag.objects.filter(slug__in=slugs).values_list('id', flat=True)
+    )
@@ -0,0 +1,59 @@
+from services.routers import (
+    get_pin_keys,
+    is_pinned_to_primary,
+    pin_to_primary,
+    reset_read_from_replica,
+    set_read_from_replica,
+)
+
+from django.conf import settings
+
+from rest_framework.permissions import SAFE_METHODS
+
+
+WRITE_ACTIONS = {'create', 'update', 'partial_update', 'destroy'}
+
+
+def is_write_request(request, view_func) -> bool:
+    """A request writes, if its method is not safe or it is routed to
+    a writing viewset action, e.g. adding a recipe to favorites by GET.
+    """
+    actions = getattr(view_func, 'actions', None) or {}
+    return (request.method not in SAFE_METHODS
+            or actions.get(request.method.lower()) in WRITE_ACTIONS)
+
+
+class ReplicaRoutingMiddleware:
+    """Lets ReplicaRouter read from replicas during reading requests.
+    A successful write pins the client to the primary database for
+    REPLICA_PIN_SECONDS, so it reads its own writes despite replica lag.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        request.replica_pin_keys = get_pin_keys(request)
+        request.writes_to_database = request.method not in SAFE_METHODS
+        token = set_read_from_replica(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_read_from_replica(token)
+
+        if request.writes_to_database and response.status_code < 400:
+            pin_to_primary(request.replica_pin_keys)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.DATABASE_REPLICAS:
+            return None
+
+        request.writes_to_database = is_write_request(request, view_func)
+        set_read_from_replica(
+            not request.writes_to_database
+            and not is_pinned_to_primary(request.replica_pin_keys)
+        )
+        return None
@@ -1,4 +1,70 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.cache import cache
+from django.core.paginator import (
+    EmptyPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, router
+from django.db.models import Model, QuerySet
+from django.utils.functional import cached_property
+
+from rest_framework.pagination import (
+    BasePagination,
+    PageNumberPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import List, Optional, Type
+
+
+ESTIMATED_COUNT_THRESHOLD = 10000
+# Results up to this size are counted exactly, larger ones approximately.
+EXACT_COUNT_LIMIT = 1000
+COUNT_CACHE_KEY = 'count:{table}:{digest}'
+COUNT_CACHE_TIMEOUT = 60
+
+
+def get_estimated_table_count(model: Type[Model]) -> Optional[int]:
+    """Returns the number of rows of a model table from PostgreSQL planner
+    statistics, or None, if the database does not keep them.
+    """
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+def get_estimated_query_count(queryset: QuerySet) -> Optional[int]:
+    """Returns the number of rows of a queryset estimated by PostgreSQL
+    planner, or None, if the database does not provide estimates.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -6,3 +72,177 @@ class CustomPageNumberPagination(PageNumberPagination):
     from 'page_size' to 'limit'.
     """
     page_size_query_param = 'limit'
+
+
+class EstimatedCountPaginator(Paginator):
+    """Django paginator for admin changelists of large tables: the count of
+    an unfiltered queryset is taken from planner statistics instead of
+    COUNT(*), once the table is larger than ESTIMATED_COUNT_THRESHOLD.
+    """
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = get_estimated_table_count(queryset.model)
+            if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class ApproximatePage(Page):
+    """A page, which knows whether there are more objects after it
+    regardless of the paginator count.
+    """
+    has_more = False
+
+    def has_next(self) -> bool:
+        return self.has_more
+
+
+class ApproximateCountPaginator(Paginator):
+    """Counts a queryset exactly up to EXACT_COUNT_LIMIT objects with
+    a bounded COUNT. A larger count is approximate: cached per query (filter
+    signature) for COUNT_CACHE_TIMEOUT, or else estimated by the planner, or
+    counted exactly where there is no planner estimate. A cached count is
+    served without counting at all. Pages are fetched with one extra object,
+    so the next page is known without the count.
+    """
+    count_is_approximate = False
+
+    def get_cache_key(self) -> Optional[str]:
+        queryset = self.object_list
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        digest = hashlib.md5(f'{sql}{params!r}'.encode()).hexdigest()
+        return COUNT_CACHE_KEY.format(
+            table=queryset.model._meta.db_table,
+            digest=digest
+        )
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        key = self.get_cache_key()
+        count = cache.get(key) if key else None
+        if count is not None:
+            self.count_is_approximate = True
+            return count
+
+        bounded = queryset[:EXACT_COUNT_LIMIT + 1].count()
+        if bounded <= EXACT_COUNT_LIMIT:
+            return bounded
+
+        self.count_is_approximate = True
+        count = (
+            (get_estimated_table_count(queryset.model)
+             if not queryset.query.where
+             else get_estimated_query_count(queryset))
+            or queryset.count()
+        )
+        count = max(count, bounded)
+        if key:
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+    def validate_number(self, number) -> int:
+        """An approximate count may be too low, so pages beyond it are
+        allowed, an empty page is rejected in page().
+        """
+        if self.count and not self.count_is_approximate:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number) -> ApproximatePage:
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage('That page contains no results')
+
+        page = ApproximatePage(objects[:self.per_page], number, self)
+        page.has_more = len(objects) > self.per_page
+        return page
+
+
+class ApproximateCountPagination(CustomPageNumberPagination):
+    """Page number pagination, which does not run an exact COUNT over
+    large results, see ApproximateCountPaginator. <count_is_approximate>
+    tells a client whether the count is exact.
+    """
+    django_paginator_class = ApproximateCountPaginator
+
+    def get_paginated_response(self, data: list) -> Response:
+        paginator = self.page.paginator
+        return Response(OrderedDict([
+            ('count', paginator.count),
+            ('count_is_approximate', paginator.count_is_approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class KeysetPagination(BasePagination):
+    """Paginates a sequence of ids sorted in descending order by keyset:
+    the next page is requested with <cursor>, the last id of the current page,
+    so the cost of a page does not depend on how deep it is.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_cursor(self, request: Request) -> Optional[int]:
+        try:
+            return _positive_int(
+                request.query_params[self.cursor_query_param],
+                strict=True
+            )
+        except (KeyError, ValueError):
+            return None
+
+    def paginate_ids(self, ids: List[int], request: Request) -> List[int]:
+        """Accepts up to page_size + 1 ids, fetched after the cursor,
+        and returns the ids of the current page.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        page = ids[:page_size]
+        self.next_cursor = page[-1] if len(ids) > page_size else None
+        return page
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor
+        )
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
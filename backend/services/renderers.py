@@ -0,0 +1,52 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+import msgpack
+import orjson
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Renders the same compact, non-ascii JSON as DRF JSONRenderer, but with
+    orjson. Types orjson does not support natively (dates are passed through
+    on purpose) are converted by DRF JSONEncoder, so values look the same.
+    Indented output, requested by browsable API, is left to JSONRenderer.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=self.options
+        )
+        # Escaped by JSONRenderer for compatibility with javascript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renders MessagePack for clients sending
+    "Accept: application/msgpack" or using "?format=msgpack".
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = encoders.JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(
+            data,
+            default=self.encoder_class().default,
+            use_bin_type=True
+        )
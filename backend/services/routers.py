@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+import hashlib
+import logging
+import random
+import time
+from contextvars import ContextVar, Token
+from typing import Dict, List, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+REPLICA_PIN_CACHE_KEY = 'replica:pin:{}'
+REPLICA_LAG_SQL = {
+    'postgresql': (
+        'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+        'THEN 0 ELSE coalesce(extract(epoch FROM '
+        'now() - pg_last_xact_replay_timestamp()), 0) END'
+    ),
+    # A local SQLite copy has no replication, it is only checked to be
+    # readable.
+    'sqlite': 'SELECT 0 FROM django_migrations LIMIT 1',
+}
+
+_read_from_replica: ContextVar[bool] = ContextVar(
+    'read_from_replica',
+    default=False
+)
+# Alias -> (time of the last check, whether the replica is healthy).
+_replica_health: Dict[str, Tuple[float, bool]] = {}
+
+
+def get_replica_aliases() -> List[str]:
+    return [
+        f'replica{number}'
+        for number in range(1, len(settings.DATABASE_REPLICAS) + 1)
+    ]
+
+
+def get_replica_lag(alias: str) -> float:
+    """Returns how many seconds the replica is behind the primary."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(REPLICA_LAG_SQL.get(connection.vendor, 'SELECT 0'))
+        row = cursor.fetchone()
+    return float(row[0]) if row else 0.0
+
+
+def is_replica_healthy(alias: str) -> bool:
+    """A replica is healthy, if it is reachable and lags behind less than
+    REPLICA_MAX_LAG_SECONDS. The result is kept in process for
+    REPLICA_CHECK_INTERVAL seconds.
+    """
+    checked_at, healthy = _replica_health.get(alias, (0.0, False))
+    if time.monotonic() - checked_at < settings.REPLICA_CHECK_INTERVAL:
+        return healthy
+
+    try:
+        lag = get_replica_lag(alias)
+        healthy = lag <= settings.REPLICA_MAX_LAG_SECONDS
+        if not healthy:
+            logger.warning('Replica %s lags behind by %.1f s.', alias, lag)
+    except DatabaseError:
+        logger.warning('Replica %s is unavailable.', alias, exc_info=True)
+        healthy = False
+
+    _replica_health[alias] = (time.monotonic(), healthy)
+    return healthy
+
+
+def set_read_from_replica(value: bool) -> Token:
+    return _read_from_replica.set(value)
+
+
+def reset_read_from_replica(token: Token) -> None:
+    _read_from_replica.reset(token)
+
+
+def get_token_pin_key(token: str) -> str:
+    return REPLICA_PIN_CACHE_KEY.format(
+        hashlib.sha256(token.encode()).hexdigest()
+    )
+
+
+def get_pin_keys(request) -> List[str]:
+    """A client is identified by the token of its Authorization header.
+    Anonymous clients are not pinned: behind a proxy their address is
+    the proxy's one, shared by all clients. A token created by a login is
+    pinned by the login view, see pin_token_to_primary.
+    """
+    _, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return [get_token_pin_key(token.strip())] if token.strip() else []
+
+
+def pin_to_primary(keys: List[str]) -> None:
+    if not keys:
+        return
+    cache.set_many(
+        {key: True for key in keys},
+        timeout=settings.REPLICA_PIN_SECONDS
+    )
+
+
+def is_pinned_to_primary(keys: List[str]) -> bool:
+    return bool(keys) and bool(cache.get_many(keys))
+
+
+def pin_token_to_primary(token: str) -> None:
+    """Pins the requests with a token just created on the primary,
+    which the replicas may not have yet.
+    """
+    if settings.DATABASE_REPLICAS:
+        pin_to_primary([get_token_pin_key(token)])
+
+
+class ReplicaRouter:
+    """Routes reads to a healthy replica, when the request allows it
+    (see ReplicaRoutingMiddleware), and everything else to the primary.
+    Reads inside a transaction stay on the primary, so they see its writes.
+    """
+    def db_for_read(self, model, **hints) -> str:
+        if (not _read_from_replica.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+
+        replicas = [
+            alias for alias in get_replica_aliases()
+            if is_replica_healthy(alias)
+        ]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        """Replicas hold the same data as the primary."""
+        return True
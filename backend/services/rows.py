@@ -0,0 +1,385 @@
+from recipes.models import Recipe
+from users.models import UserCart, UserRecipe, UserSubscription
+from services.cache import get_catalog_version
+from services.serializer_fields import HEXToColourNameField
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import QuerySet
+from django.db.models.expressions import RawSQL
+
+from rest_framework.generics import get_object_or_404
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Correlated subqueries aggregating tags and ingredients of a recipe into
+# a JSON array, in the order they were added to the recipe.
+AGGREGATE_SQL = {
+    'postgresql': {
+        'tags': (
+            "SELECT coalesce(json_agg(json_build_object("
+            "'id', t.id, 'name', t.name, 'color', t.color, 'slug', t.slug"
+            ") ORDER BY rt.id), '[]'::json) "
+            "FROM recipes_recipetag rt "
+            "JOIN recipes_tag t ON t.id = rt.tag_id "
+            "WHERE rt.recipe_id = recipes_recipe.id"
+        ),
+        'ingredients': (
+            "SELECT coalesce(json_agg(json_build_object("
+            "'id', i.id, 'name', i.name, "
+            "'measurement_unit', i.measurement_unit, 'amount', ri.amount"
+            ") ORDER BY ri.id), '[]'::json) "
+            "FROM recipes_recipeingredient ri "
+            "JOIN recipes_ingredient i ON i.id = ri.ingredient_id "
+            "WHERE ri.recipe_id = recipes_recipe.id"
+        ),
+    },
+    'sqlite': {
+        'tags': (
+            "SELECT json_group_array(json_object("
+            "'id', id, 'name', name, 'color', color, 'slug', slug)) "
+            "FROM (SELECT t.id, t.name, t.color, t.slug "
+            "FROM recipes_recipetag rt "
+            "JOIN recipes_tag t ON t.id = rt.tag_id "
+            "WHERE rt.recipe_id = recipes_recipe.id ORDER BY rt.id)"
+        ),
+        'ingredients': (
+            "SELECT json_group_array(json_object("
+            "'id', id, 'name', name, "
+            "'measurement_unit', measurement_unit, 'amount', amount)) "
+            "FROM (SELECT i.id, i.name, i.measurement_unit, ri.amount "
+            "FROM recipes_recipeingredient ri "
+            "JOIN recipes_ingredient i ON i.id = ri.ingredient_id "
+            "WHERE ri.recipe_id = recipes_recipe.id ORDER BY ri.id)"
+        ),
+    },
+}
+
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email')
+
+# Fields of a recipe representation, which do not depend on a user.
+SHARED_FIELDS = (
+    'id',
+    'name',
+    'image',
+    'text',
+    'cooking_time',
+    'tags',
+    'author',
+    'ingredients',
+)
+RECIPE_CACHE_KEY = 'recipe:{id}:{version}:{catalog_version}'
+
+
+@lru_cache(maxsize=256)
+def get_tag_color(color_name: str) -> str:
+    return HEXToColourNameField().to_representation(color_name)
+
+
+def get_user_id(request: Request) -> Optional[int]:
+    return request.user.id if request.user.is_authenticated else None
+
+
+def get_followed_author_ids(request: Request) -> Set[int]:
+    """Returns ids of the authors request.user is subscribed on, fetched
+    with one query per request and kept on the request.
+    """
+    user_id = get_user_id(request)
+    if user_id is None:
+        return set()
+
+    if getattr(request, '_followed_author_ids', None) is None:
+        request._followed_author_ids = set(
+            UserSubscription.objects
+            .filter(follower_id=user_id)
+            .values_list('author_id', flat=True)
+        )
+    return request._followed_author_ids
+
+
+def forget_followed_author_ids(request: Request) -> None:
+    """Makes the next get_followed_author_ids() refetch the ids
+    after subscriptions of request.user have changed.
+    """
+    request._followed_author_ids = None
+
+
+def is_subscribed_author(request: Request, author_id: int) -> bool:
+    """A user is considered to be subscribed on itself."""
+    user_id = get_user_id(request)
+    return (user_id is not None
+            and (author_id == user_id
+                 or author_id in get_followed_author_ids(request)))
+
+
+def _load_json(value) -> list:
+    """psycopg2 parses json columns, sqlite returns them as text."""
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def fetch_recipe_rows(recipe_ids: Iterable[int],
+                      fields: Iterable[str]) -> Dict[int, dict]:
+    """Returns plain rows of the given recipes by id, with only columns and
+    aggregates the requested fields need. Tags and ingredients are
+    aggregated into JSON arrays by the database.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return {}
+
+    columns = ['id', 'name', 'image', 'cooking_time', 'author_id']
+    if 'text' in fields:
+        columns.append('text')
+    if 'author' in fields:
+        columns.extend(
+            f'author__{field}' for field in AUTHOR_FIELDS if field != 'id'
+        )
+
+    aggregates = AGGREGATE_SQL[connection.vendor]
+    annotations = {
+        f'{field}_json': RawSQL(aggregates[field], ())
+        for field in ('tags', 'ingredients') if field in fields
+    }
+
+    rows = (
+        Recipe.objects
+        .filter(id__in=recipe_ids)
+        .values(*columns, **annotations)
+    )
+    return {row['id']: row for row in rows}
+
+
+class UserFlags:
+    """Favorites and shopping cart of the request user among the given
+    recipes, fetched with one query each, and its subscriptions, fetched
+    once per request.
+    """
+    def __init__(self,
+                 request: Optional[Request],
+                 recipe_ids: Iterable[int],
+                 fields: Iterable[str]):
+        self.request = request
+        self.user_id = get_user_id(request) if request else None
+        self.favorites: Set[int] = set()
+        self.shopping_cart: Set[int] = set()
+
+        if self.user_id is None:
+            return
+
+        recipe_ids = list(recipe_ids)
+        if 'is_favorited' in fields:
+            self.favorites = set(
+                UserRecipe.objects
+                .filter(user_id=self.user_id, recipe_id__in=recipe_ids)
+                .values_list('recipe_id', flat=True)
+            )
+        if 'is_in_shopping_cart' in fields:
+            self.shopping_cart = set(
+                UserCart.recipes.through.objects
+                .filter(
+                    usercart__user_id=self.user_id,
+                    recipe_id__in=recipe_ids
+                )
+                .values_list('recipe_id', flat=True)
+            )
+
+    def is_subscribed(self, author_id: int) -> bool:
+        return (self.user_id is not None
+                and is_subscribed_author(self.request, author_id))
+
+
+def render_recipe_row(row: dict, fields: Iterable[str], flags: UserFlags,
+                      storage) -> dict:
+    """Maps a plain recipe row to the public schema of RecipeSerializer.
+    """
+    representation = {}
+    for field in fields:
+        if field == 'image':
+            value = storage.url(row['image']) if row['image'] else None
+        elif field == 'tags':
+            value = [
+                {
+                    'id': tag['id'],
+                    'name': tag['name'],
+                    'color': get_tag_color(tag['color']),
+                    'slug': tag['slug'],
+                } for tag in _load_json(row['tags_json'])
+            ]
+        elif field == 'author':
+            value = {
+                'id': row['author_id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'email': row['author__email'],
+                'is_subscribed': flags.is_subscribed(row['author_id']),
+            }
+        elif field == 'ingredients':
+            value = _load_json(row['ingredients_json'])
+        elif field == 'is_favorited':
+            value = row['id'] in flags.favorites
+        elif field == 'is_in_shopping_cart':
+            value = row['id'] in flags.shopping_cart
+        else:
+            value = row[field]
+        representation[field] = value
+    return representation
+
+
+def render_recipe_rows(recipe_ids: Iterable[int],
+                       fields: Iterable[str],
+                       request: Request) -> List[dict]:
+    """Renders the given recipes in the given order with the same output
+    as RecipeSerializer, but without instantiating models or serializers.
+    """
+    recipe_ids = list(recipe_ids)
+    rows = fetch_recipe_rows(recipe_ids, fields)
+    flags = UserFlags(request=request, recipe_ids=rows, fields=fields)
+    storage = Recipe._meta.get_field('image').storage
+    return [
+        render_recipe_row(rows[recipe_id], fields, flags, storage)
+        for recipe_id in recipe_ids if recipe_id in rows
+    ]
+
+
+def get_recipe_cache_key(recipe_id: int,
+                         creation_date: datetime,
+                         catalog_version: int) -> str:
+    """The version of a recipe is its <creation_date>, which is
+    updated on every save of the recipe.
+    """
+    return RECIPE_CACHE_KEY.format(
+        id=recipe_id,
+        version=int(creation_date.timestamp() * 1000000),
+        catalog_version=catalog_version
+    )
+
+
+def invalidate_recipe_representations(
+        recipes: Iterable[Tuple[int, datetime]]) -> None:
+    """Accepts (id, creation_date) pairs and removes the cached
+    representations of the recipes.
+    """
+    catalog_version = get_catalog_version()
+    cache.delete_many([
+        get_recipe_cache_key(recipe_id, creation_date, catalog_version)
+        for recipe_id, creation_date in recipes
+    ])
+
+
+def get_shared_representations(
+        recipes: List[Tuple[int, datetime]]) -> Dict[int, dict]:
+    """Returns user-independent representations of the given (id,
+    creation_date) recipes: cached ones with one multi-get, the missing ones
+    are rendered from rows and cached.
+    """
+    catalog_version = get_catalog_version()
+    keys = {
+        recipe_id: get_recipe_cache_key(
+            recipe_id, creation_date, catalog_version
+        ) for recipe_id, creation_date in recipes
+    }
+    cached = cache.get_many(list(keys.values()))
+    shared = {
+        recipe_id: cached[key]
+        for recipe_id, key in keys.items() if key in cached
+    }
+
+    missing = [recipe_id for recipe_id in keys if recipe_id not in shared]
+    if missing:
+        no_flags = UserFlags(None, (), ())
+        storage = Recipe._meta.get_field('image').storage
+        built = {}
+        for recipe_id, row in fetch_recipe_rows(missing, SHARED_FIELDS).items():
+            representation = render_recipe_row(
+                row, SHARED_FIELDS, no_flags, storage
+            )
+            del representation['author']['is_subscribed']
+            built[recipe_id] = representation
+
+        cache.set_many(
+            {keys[recipe_id]: value for recipe_id, value in built.items()},
+            timeout=settings.RECIPE_CACHE_TIMEOUT
+        )
+        shared.update(built)
+
+    return shared
+
+
+def overlay_user_flags(shared: dict,
+                       fields: Iterable[str],
+                       flags: UserFlags) -> dict:
+    """Projects a shared representation onto the requested fields and
+    adds the user-dependent flags.
+    """
+    representation = {}
+    for field in fields:
+        if field == 'author':
+            value = dict(
+                shared['author'],
+                is_subscribed=flags.is_subscribed(shared['author']['id'])
+            )
+        elif field == 'is_favorited':
+            value = shared['id'] in flags.favorites
+        elif field == 'is_in_shopping_cart':
+            value = shared['id'] in flags.shopping_cart
+        else:
+            value = shared[field]
+        representation[field] = value
+    return representation
+
+
+def render_cached_recipe_rows(recipes: Iterable[Tuple[int, datetime]],
+                              fields: Iterable[str],
+                              request: Request) -> List[dict]:
+    """Renders the given (id, creation_date) recipes in the given order with
+    the same output as RecipeSerializer. The user-independent part comes from
+    the per-recipe cache, the flags are looked up per page.
+    """
+    recipes = list(recipes)
+    shared = get_shared_representations(recipes)
+    flags = UserFlags(request=request, recipe_ids=shared, fields=fields)
+    return [
+        overlay_user_flags(shared[recipe_id], fields, flags)
+        for recipe_id, _ in recipes if recipe_id in shared
+    ]
+
+
+class CachedRecipeRowMixin:
+    """Lists and retrieves recipes of the viewset queryset through the cached
+    row rendering path: the page is fetched as (id, creation_date) pairs,
+    and representations for them from the cache or as plain rows.
+    """
+    def get_recipe_rows(self, queryset: QuerySet):
+        """Returns (id, creation_date) of the listed recipes in order."""
+        return queryset.values_list('id', 'creation_date')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.serializer_class.get_requested_fields(request, many=True)
+
+        recipes = self.get_recipe_rows(queryset)
+        page = self.paginate_queryset(recipes)
+        if page is not None:
+            return self.get_paginated_response(
+                render_cached_recipe_rows(page, fields, request)
+            )
+        return Response(render_cached_recipe_rows(recipes, fields, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = get_object_or_404(
+            self.get_queryset().values_list('id', 'creation_date'),
+            pk=self.kwargs['pk']
+        )
+        return Response(render_cached_recipe_rows(
+            [recipe],
+            self.serializer_class.get_requested_fields(request),
+            request
+        )[0])
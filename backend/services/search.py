@@ -0,0 +1,177 @@
+from recipes.models import Recipe
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, QuerySet, Value, When
+
+import re
+from typing import Iterable, List
+
+
+SEARCH_RESULTS_LIMIT = 1000
+WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+WORD_ENDINGS = (
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ах', 'ях', 'ам', 'ям', 'ов', 'ев', 'ей', 'ой', 'ий', 'ый', 'ом', 'ем',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+)
+
+
+class PostgreSQLSearchBackend:
+    """Keeps a weighted tsvector of recipe name (A) and text (B) with
+    russian stemming in <Recipe.search_vector>, covered by a GIN index.
+    """
+    config = 'russian'
+
+    def index(self, recipe_ids: Iterable[int]) -> None:
+        Recipe.objects.filter(id__in=list(recipe_ids)).update(
+            search_vector=(
+                SearchVector('name', weight='A', config=self.config)
+                + SearchVector('text', weight='B', config=self.config)
+            )
+        )
+
+    def remove(self, recipe_ids: Iterable[int]) -> None:
+        """The vector is stored in the recipe row, nothing to remove."""
+
+    def rebuild(self) -> None:
+        self.index(Recipe.objects.values_list('id', flat=True))
+
+    def search(self, queryset: QuerySet, query: str) -> QuerySet:
+        search_query = SearchQuery(
+            query,
+            config=self.config,
+            search_type='websearch'
+        )
+        return (
+            queryset
+            .filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-id')
+        )
+
+
+class SQLiteSearchBackend:
+    """Keeps recipe name and text in the <recipes_recipe_fts> FTS5 table for
+    local runs. FTS5 has no russian stemmer, so words are matched by prefix
+    with their ending cut off. Name is weighted over text in bm25 ranking.
+    """
+    table = 'recipes_recipe_fts'
+    weights = (10.0, 1.0)
+
+    def index(self, recipe_ids: Iterable[int]) -> None:
+        recipe_ids = list(recipe_ids)
+        rows = Recipe.objects.filter(id__in=recipe_ids).values_list(
+            'id', 'name', 'text'
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(recipe_id,) for recipe_id in recipe_ids]
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, name, text) '
+                f'VALUES (%s, %s, %s)',
+                list(rows)
+            )
+
+    def remove(self, recipe_ids: Iterable[int]) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(recipe_id,) for recipe_id in recipe_ids]
+            )
+
+    def rebuild(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, text) '
+                f'SELECT id, name, text FROM recipes_recipe'
+            )
+
+    def stem(self, word: str) -> str:
+        for ending in WORD_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= 3:
+                return word[:-len(ending)]
+        return word
+
+    def to_match_expression(self, query: str) -> str:
+        return ' '.join(
+            f'"{self.stem(word)}"*'
+            for word in WORD_PATTERN.findall(query.lower())
+        )
+
+    def get_ranked_ids(self, query: str) -> List[int]:
+        match_expression = self.to_match_expression(query)
+        if not match_expression:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, %s, %s) LIMIT %s',
+                [match_expression, *self.weights, SEARCH_RESULTS_LIMIT]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, queryset: QuerySet, query: str) -> QuerySet:
+        recipe_ids = self.get_ranked_ids(query)
+        if not recipe_ids:
+            return queryset.none()
+
+        position = Case(
+            *[When(id=recipe_id, then=Value(position))
+              for position, recipe_id in enumerate(recipe_ids)],
+            output_field=IntegerField()
+        )
+        return (
+            queryset
+            .filter(id__in=recipe_ids)
+            .annotate(rank=-position)
+            .order_by('-rank')
+        )
+
+
+class BasicSearchBackend:
+    """Fallback for databases without full-text search support."""
+
+    def index(self, recipe_ids: Iterable[int]) -> None:
+        pass
+
+    def remove(self, recipe_ids: Iterable[int]) -> None:
+        pass
+
+    def rebuild(self) -> None:
+        pass
+
+    def search(self, queryset: QuerySet, query: str) -> QuerySet:
+        return queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        ).order_by('-id')
+
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgreSQLSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    """Returns a search backend for the database in use."""
+    return SEARCH_BACKENDS.get(connection.vendor, BasicSearchBackend)()
+
+
+def search_recipes(queryset: QuerySet, query: str) -> QuerySet:
+    """Returns recipes of the queryset matching the query,
+    ordered by rank. Returns the queryset as is for an empty query.
+    """
+    if not query or not query.strip():
+        return queryset
+    return get_search_backend().search(queryset, query.strip())
@@ -1,10 +1,15 @@
+from services.uploads import (
+    get_image_content_extension,
+    get_uploaded_image_name
+)
+
 from django.core.files.base import ContentFile
 from django.db import models
 
 from rest_framework import serializers
 
-import time
 import base64
+import binascii
 import webcolors
 from typing import Union
 
@@ -13,20 +18,35 @@ class Base64ToContentFileField(serializers.Field):
     def to_representation(self, image: models.ImageField) -> Union[str, None]:
         return image.url if image else None
 
-    def to_internal_value(self, data: str) -> ContentFile:
+    def to_internal_value(self, data: str) -> Union[ContentFile, str]:
         """Accepts a base64-encoded string and returns django
-        ContentFile instance.
+        ContentFile instance. The file is named by the storage after
+        its content, the extension is taken from the detected format,
+        not from the MIME type, and only raster images pass.
+        Also accepts an upload id of an image uploaded beforehand
+        and returns the name of the stored image.
         """
+        if isinstance(data, str) and ';base64,' not in data:
+            request = self.context.get('request')
+            name = get_uploaded_image_name(
+                data,
+                user_id=request.user.id if request else None
+            )
+            if name is None:
+                raise serializers.ValidationError(
+                    'Invalid or expired image upload id.'
+                )
+            return name
+
         try:
             _, base64_string = data.split(';base64,')
-            return ContentFile(
-                content=base64.b64decode(base64_string),
-                name=f'{time.time()}.webp'
-            )
-        except Exception as e:
+            content = base64.b64decode(base64_string, validate=True)
+        except (AttributeError, ValueError, binascii.Error):
             raise serializers.ValidationError(
                 'Failed to convert base64-string to a ContentFile instance.'
             )
+        extension = get_image_content_extension(content)
+        return ContentFile(content=content, name=f'image{extension}')
 
 
 class HEXToColourNameField(serializers.Field):
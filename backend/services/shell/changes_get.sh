@@ -0,0 +1 @@
+http --pretty all --ignore-stdin "localhost:8000/api/changes/?since=0&limit=100" "Authorization: Token $JWT_TOKEN"
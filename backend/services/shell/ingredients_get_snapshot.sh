@@ -0,0 +1 @@
+http --pretty all --ignore-stdin --follow localhost:8000/api/ingredients/snapshot/
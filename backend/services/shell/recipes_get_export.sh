@@ -0,0 +1 @@
+http --pretty all --ignore-stdin "localhost:8000/api/recipes/export/ndjson/?after=0" "Authorization: Token $JWT_TOKEN"
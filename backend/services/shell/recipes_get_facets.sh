@@ -0,0 +1 @@
+http --pretty all --ignore-stdin "localhost:8000/api/recipes/facets/?tags=breakfast&tags=dinner&tags_mode=all&cooking_time=1&is_favorited=1" "Authorization: Token $JWT_TOKEN"
@@ -0,0 +1 @@
+http --pretty all --ignore-stdin "localhost:8000/api/recipes/pantry/?ingredients=1,2,3&tags=breakfast&max_missing=2" "Authorization: Token $JWT_TOKEN"
@@ -0,0 +1 @@
+http --pretty all --ignore-stdin localhost:8000/api/recipes/9/similar/ "Authorization: Token $JWT_TOKEN"
@@ -0,0 +1,2 @@
+http --pretty all POST localhost:8000/api/recipes/images/ \
+    "Content-Type: image/png" "Authorization: Token $JWT_TOKEN" < image.png
@@ -0,0 +1,2 @@
+http --pretty all --ignore-stdin -f POST localhost:8000/api/auth/token/refresh/ \
+    refresh=$REFRESH_TOKEN
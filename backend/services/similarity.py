@@ -0,0 +1,427 @@
+from recipes.models import (
+    Recipe,
+    RecipeIngredient,
+    RecipeNeighbours,
+    RecipeTag,
+)
+from services.indexes import fetch_columns
+
+from django.db import transaction
+
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+
+SIMILAR_RECIPES_LIMIT = 10
+# Weight of a shared tag relative to a shared ingredient.
+TAG_WEIGHT = 0.5
+# Size of a batch of the similarity matrix computed at once, in cells.
+SIMILARITY_BATCH_CELLS = 2 ** 24
+# The matrix kept in process is rebuilt from the database this often,
+# so it picks up changes made by other processes.
+SIMILARITY_MATRIX_TTL = 60 * 10
+# Changed rows are folded into the matrix in batches of this size.
+SIMILARITY_PENDING_ROWS = 256
+# Chunk of ids in one IN (...) lookup.
+LOOKUP_CHUNK_SIZE = 900
+
+NEIGHBOUR_DTYPE = np.dtype([('id', '<i8'), ('score', '<f4')])
+
+# A row of the matrix: sorted column indexes and their values.
+Vector = Tuple[np.ndarray, np.ndarray]
+
+
+def pack_neighbours(recipe_ids: np.ndarray, scores: np.ndarray) -> bytes:
+    neighbours = np.empty(len(recipe_ids), dtype=NEIGHBOUR_DTYPE)
+    neighbours['id'] = recipe_ids
+    neighbours['score'] = scores
+    return neighbours.tobytes()
+
+
+def unpack_neighbours(packed: bytes) -> np.ndarray:
+    return np.frombuffer(bytes(packed), dtype=NEIGHBOUR_DTYPE)
+
+
+def dot(first: Optional[Vector], second: Optional[Vector]) -> float:
+    if first is None or second is None:
+        return 0.0
+    _, first_positions, second_positions = np.intersect1d(
+        first[0], second[0], assume_unique=True, return_indices=True
+    )
+    return float(first[1][first_positions] @ second[1][second_positions])
+
+
+def top_neighbours(scores: np.ndarray,
+                   limit: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Accepts a (rows, recipes) array of scores and returns column indexes
+    and scores of the <limit> highest positive scores of every row, in
+    descending order. Missing neighbours have a score of 0.
+    """
+    limit = min(limit, scores.shape[1])
+    if limit < scores.shape[1]:
+        columns = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+    else:
+        columns = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    top_scores = np.take_along_axis(scores, columns, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return (
+        np.take_along_axis(columns, order, axis=1),
+        np.take_along_axis(top_scores, order, axis=1),
+    )
+
+
+class SimilarityMatrix:
+    """Recipes as rows of a sparse matrix over ingredient and tag columns:
+    1 for an ingredient, TAG_WEIGHT for a tag. Rows are L2-normalized, so
+    the product of two rows is the cosine similarity of the recipes.
+    """
+    def __init__(self):
+        self.built_at = time.monotonic()
+        self.recipe_ids = np.fromiter(
+            Recipe.objects.order_by('id').values_list('id', flat=True),
+            dtype=np.int64
+        )
+        ingredients = fetch_columns(
+            RecipeIngredient.objects.all(), 'recipe_id', 'ingredient_id'
+        )
+        tags = fetch_columns(RecipeTag.objects.all(), 'recipe_id', 'tag_id')
+
+        self.columns: Dict[Tuple[str, int], int] = {}
+        self.rows = np.searchsorted(
+            self.recipe_ids,
+            np.concatenate([ingredients[:, 0], tags[:, 0]])
+        )
+        self.cols = np.concatenate([
+            self.get_columns('ingredient', ingredients[:, 1]),
+            self.get_columns('tag', tags[:, 1]),
+        ])
+        self.values = np.concatenate([
+            np.ones(len(ingredients), dtype=np.float32),
+            np.full(len(tags), TAG_WEIGHT, dtype=np.float32),
+        ])
+        self.pending: Dict[int, Optional[Vector]] = {}
+        self.build()
+
+    def get_columns(self, kind: str, ids: np.ndarray) -> np.ndarray:
+        """Maps ingredient or tag ids to column indexes,
+        adding columns for unseen ids.
+        """
+        columns = np.empty(len(ids), dtype=np.int64)
+        for position, id in enumerate(ids.tolist()):
+            columns[position] = self.columns.setdefault(
+                (kind, id), len(self.columns)
+            )
+        return columns
+
+    def build(self) -> None:
+        matrix = sparse.csr_matrix(
+            (self.values, (self.rows, self.cols)),
+            shape=(len(self.recipe_ids), max(len(self.columns), 1)),
+            dtype=np.float32
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+        norms = norms.ravel()
+        norms[norms == 0] = 1
+        self.matrix = sparse.diags(1 / norms).dot(matrix).tocsr()
+
+    def get_vector(self, recipe_id: int) -> Optional[Vector]:
+        """Returns the L2-normalized row of a recipe from its current
+        ingredients and tags, or None if the recipe does not exist.
+        """
+        if not Recipe.objects.filter(id=recipe_id).exists():
+            return None
+        ingredient_ids = np.fromiter(
+            RecipeIngredient.objects.filter(recipe_id=recipe_id)
+            .values_list('ingredient_id', flat=True),
+            dtype=np.int64
+        )
+        tag_ids = np.fromiter(
+            RecipeTag.objects.filter(recipe_id=recipe_id)
+            .values_list('tag_id', flat=True),
+            dtype=np.int64
+        )
+        cols = np.concatenate([
+            self.get_columns('ingredient', ingredient_ids),
+            self.get_columns('tag', tag_ids),
+        ])
+        values = np.concatenate([
+            np.ones(len(ingredient_ids), dtype=np.float32),
+            np.full(len(tag_ids), TAG_WEIGHT, dtype=np.float32),
+        ])
+        order = np.argsort(cols)
+        norm = np.sqrt(np.square(values).sum()) or 1
+        return cols[order], values[order] / norm
+
+    def update_recipe(self, recipe_id: int) -> Optional[Vector]:
+        """Replaces the row of a recipe with its current ingredients and
+        tags, or removes it, and returns the row. Changed rows are kept
+        apart in <pending> and folded into the matrix in batches of
+        SIMILARITY_PENDING_ROWS, so a write does not rebuild the matrix.
+        """
+        vector = self.get_vector(recipe_id)
+        self.pending[recipe_id] = vector
+        if len(self.pending) >= SIMILARITY_PENDING_ROWS:
+            self.fold()
+        return vector
+
+    def fold(self) -> None:
+        """Moves the pending rows into the matrix and rebuilds it."""
+        pending_ids = np.fromiter(self.pending, dtype=np.int64)
+        row_ids = self.recipe_ids[self.rows]
+        keep = ~np.isin(row_ids, pending_ids)
+        vectors = [
+            (recipe_id, vector) for recipe_id, vector in self.pending.items()
+            if vector is not None
+        ]
+        removed = [
+            recipe_id for recipe_id, vector in self.pending.items()
+            if vector is None
+        ]
+
+        self.recipe_ids = np.union1d(
+            np.setdiff1d(self.recipe_ids, removed),
+            np.array([recipe_id for recipe_id, _ in vectors], dtype=np.int64)
+        )
+        row_ids = np.concatenate([row_ids[keep]] + [
+            np.full(len(vector[0]), recipe_id, dtype=np.int64)
+            for recipe_id, vector in vectors
+        ])
+        self.rows = np.searchsorted(self.recipe_ids, row_ids)
+        self.cols = np.concatenate(
+            [self.cols[keep]] + [vector[0] for _, vector in vectors]
+        )
+        self.values = np.concatenate(
+            [self.values[keep]] + [vector[1] for _, vector in vectors]
+        )
+        self.pending = {}
+        self.build()
+
+    def get_recipe_scores(self,
+                          recipe_id: int,
+                          vector: Vector) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns ids of all recipes, pending ones included, and
+        similarities of the row of a recipe to them, but to itself.
+        """
+        cols, values = vector
+        width = self.matrix.shape[1]
+        inside = cols < width
+        query = sparse.csr_matrix(
+            (values[inside], (np.zeros(inside.sum(), dtype=np.int64),
+                              cols[inside])),
+            shape=(1, width),
+            dtype=np.float32
+        )
+        recipe_ids = self.recipe_ids
+        scores = (query @ self.matrix.T).toarray().ravel()
+
+        if self.pending:
+            pending_ids = np.fromiter(self.pending, dtype=np.int64)
+            pending_scores = np.array(
+                [dot(vector, self.pending[id]) for id in pending_ids.tolist()],
+                dtype=np.float32
+            )
+            positions = np.searchsorted(recipe_ids, pending_ids)
+            present = positions < len(recipe_ids)
+            present[present] = (
+                recipe_ids[positions[present]] == pending_ids[present]
+            )
+            scores[positions[present]] = pending_scores[present]
+            recipe_ids = np.concatenate([
+                recipe_ids, pending_ids[~present]
+            ])
+            scores = np.concatenate([scores, pending_scores[~present]])
+
+        scores[recipe_ids == recipe_id] = 0
+        return recipe_ids, scores
+
+    def iter_neighbours(self,
+                        rows: Iterable[int],
+                        limit: int = SIMILAR_RECIPES_LIMIT) \
+            -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """Yields (recipe id, neighbour ids, scores) of the given rows.
+        Similarities are computed for a batch of rows against all recipes
+        with one sparse product, the batch is sized to SIMILARITY_BATCH_CELLS.
+        """
+        rows = np.fromiter(rows, dtype=np.int64)
+        batch_size = max(
+            1, SIMILARITY_BATCH_CELLS // max(1, self.matrix.shape[0])
+        )
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            yield from self.get_neighbours(
+                batch, self.get_scores(batch), limit
+            )
+
+    def get_scores(self, rows: np.ndarray) -> np.ndarray:
+        """Returns a dense (rows, recipes) array of similarities of
+        the given rows to all recipes, but themselves.
+        """
+        scores = (self.matrix[rows] @ self.matrix.T).toarray()
+        scores[np.arange(len(rows)), rows] = 0
+        return scores
+
+    def get_neighbours(self,
+                       rows: np.ndarray,
+                       scores: np.ndarray,
+                       limit: int) \
+            -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        columns, top_scores = top_neighbours(scores, limit)
+        for row, row_columns, row_scores in zip(rows, columns, top_scores):
+            positive = row_scores > 0
+            yield (
+                int(self.recipe_ids[row]),
+                self.recipe_ids[row_columns[positive]],
+                row_scores[positive],
+            )
+
+
+_matrix: Optional[SimilarityMatrix] = None
+_matrix_lock = threading.Lock()
+# Set while a new matrix is built, with ids of recipes updated meanwhile.
+_rebuilding: Optional[Set[int]] = None
+
+
+def _get_matrix() -> SimilarityMatrix:
+    """Returns the matrix kept in process. Once it is older than
+    SIMILARITY_MATRIX_TTL, the first caller builds a new one outside
+    the lock, while the others keep using the old one, and swaps it in
+    with the recipes updated meanwhile applied.
+    """
+    global _matrix, _rebuilding
+    with _matrix_lock:
+        if _matrix is None:
+            _matrix = SimilarityMatrix()
+        if (_rebuilding is not None
+                or time.monotonic() - _matrix.built_at
+                <= SIMILARITY_MATRIX_TTL):
+            return _matrix
+        _rebuilding = updated = set()
+
+    try:
+        matrix = SimilarityMatrix()
+    except Exception:
+        with _matrix_lock:
+            _rebuilding = None
+        raise
+
+    with _matrix_lock:
+        for recipe_id in updated:
+            matrix.update_recipe(recipe_id)
+        _matrix = matrix
+        _rebuilding = None
+        return _matrix
+
+
+def get_min_score(scores: np.ndarray, limit: int) -> float:
+    """A recipe with a full list admits a new neighbour only above its lowest
+    score, a recipe with a shorter list admits any similar one.
+    """
+    return float(scores[-1]) if len(scores) >= limit else 0.0
+
+
+def _save_neighbours(
+        neighbours: List[Tuple[int, np.ndarray, np.ndarray]]) -> None:
+    with transaction.atomic():
+        RecipeNeighbours.objects.filter(
+            recipe_id__in=[recipe_id for recipe_id, _, _ in neighbours]
+        ).delete()
+        RecipeNeighbours.objects.bulk_create([
+            RecipeNeighbours(
+                recipe_id=recipe_id,
+                neighbours=pack_neighbours(ids, scores),
+                min_score=get_min_score(scores, SIMILAR_RECIPES_LIMIT)
+            ) for recipe_id, ids, scores in neighbours
+        ])
+
+
+def compute_similar_recipes(batch_size: int = 1000) -> int:
+    """Recomputes neighbours of all recipes from a freshly built matrix and
+    returns the number of recipes.
+    """
+    global _matrix
+    with _matrix_lock:
+        _matrix = matrix = SimilarityMatrix()
+        batch = []
+        rows = range(len(matrix.recipe_ids))
+        for neighbours in matrix.iter_neighbours(rows):
+            batch.append(neighbours)
+            if len(batch) == batch_size:
+                _save_neighbours(batch)
+                batch = []
+        if batch:
+            _save_neighbours(batch)
+        return len(matrix.recipe_ids)
+
+
+def refresh_similar_recipes(recipe_id: int) -> None:
+    """Incrementally refreshes neighbours after a recipe was created or its
+    ingredients or tags changed: its own list is recomputed, and it is merged
+    into the lists of the recipes, where it now scores above their lowest
+    neighbour. A stale entry of the recipe in a list it no longer qualifies
+    for stays until the next compute_similar_recipes run.
+    """
+    _get_matrix()
+    with _matrix_lock:
+        matrix = _matrix
+        if _rebuilding is not None:
+            _rebuilding.add(recipe_id)
+        vector = matrix.update_recipe(recipe_id)
+        if vector is None:
+            return
+        recipe_ids, scores = matrix.get_recipe_scores(recipe_id, vector)
+
+    columns, top_scores = top_neighbours(
+        scores[np.newaxis, :], SIMILAR_RECIPES_LIMIT
+    )
+    positive = top_scores[0] > 0
+    own = (
+        recipe_id,
+        recipe_ids[columns[0][positive]],
+        top_scores[0][positive],
+    )
+
+    candidates = np.flatnonzero(scores > 0)
+    candidate_scores = dict(zip(
+        recipe_ids[candidates].tolist(),
+        scores[candidates].tolist()
+    ))
+
+    merged = []
+    candidate_ids = list(candidate_scores)
+    for start in range(0, len(candidate_ids), LOOKUP_CHUNK_SIZE):
+        stored = RecipeNeighbours.objects.filter(
+            recipe_id__in=candidate_ids[start:start + LOOKUP_CHUNK_SIZE]
+        ).values_list('recipe_id', 'neighbours', 'min_score')
+        for other_id, packed, min_score in stored:
+            score = candidate_scores[other_id]
+            if score <= min_score:
+                continue
+            neighbours = unpack_neighbours(packed)
+            neighbours = np.append(
+                neighbours[neighbours['id'] != recipe_id],
+                np.array([(recipe_id, score)], dtype=NEIGHBOUR_DTYPE)
+            )
+            neighbours = np.sort(neighbours, order='score')[::-1]
+            neighbours = neighbours[:SIMILAR_RECIPES_LIMIT]
+            merged.append((other_id, neighbours['id'], neighbours['score']))
+
+    _save_neighbours([own] + merged)
+
+
+def get_similar_recipe_ids(recipe_id: int) -> Optional[List[int]]:
+    """Returns ids of the most similar recipes, most similar first, or None,
+    if the neighbours of the recipe have not been computed.
+    """
+    packed = (
+        RecipeNeighbours.objects
+        .filter(recipe_id=recipe_id)
+        .values_list('neighbours', flat=True)
+        .first()
+    )
+    if packed is None:
+        return None
+    return unpack_neighbours(packed)['id'].tolist()
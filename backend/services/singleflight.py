@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.cache import cache
+
+import math
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+
+SINGLE_FLIGHT_LOCK_KEY = 'singleflight:lock:{}'
+SINGLE_FLIGHT_RESULT_KEY = 'singleflight:result:{}:{}'
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+
+class _Flight:
+    """A computation in progress, which concurrent callers wait for."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.failed = False
+        self.result: Any = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def _compute_shared(key: str, compute: Callable, timeout: float) -> Any:
+    """Computes the result under a lock in the shared cache, so only one
+    process computes it. Other processes poll for the published result and
+    compute it themselves, if it is not published within <timeout>.
+    The result is published under the token of the flight, held by the lock,
+    so only callers, which arrived during the flight, read it.
+    """
+    lock_key = SINGLE_FLIGHT_LOCK_KEY.format(key)
+    cache_timeout = math.ceil(timeout)
+
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=cache_timeout):
+        try:
+            result = compute()
+            cache.set(
+                SINGLE_FLIGHT_RESULT_KEY.format(key, token),
+                result,
+                timeout=cache_timeout
+            )
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    token = cache.get(lock_key)
+    if token is None:
+        return compute()
+    result_key = SINGLE_FLIGHT_RESULT_KEY.format(key, token)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = cache.get(result_key, _MISSING)
+        if result is not _MISSING:
+            return result
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+    return compute()
+
+
+def single_flight(key: str,
+                  compute: Callable,
+                  timeout: Optional[float] = None,
+                  shared: Optional[bool] = None) -> Any:
+    """Coalesces concurrent computations of the same <key>: the first caller
+    computes the result, the others in the process wait for it. A waiter
+    computes the result itself, if the first caller fails or does not finish
+    within <timeout>. With <shared>, processes are coalesced as well through
+    the shared cache, then the result must be picklable.
+    """
+    timeout = settings.SINGLE_FLIGHT_TIMEOUT if timeout is None else timeout
+    shared = settings.SINGLE_FLIGHT_SHARED if shared is None else shared
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if flight.done.wait(timeout) and not flight.failed:
+            return flight.result
+        return compute()
+
+    try:
+        flight.result = (
+            _compute_shared(key, compute, timeout) if shared else compute()
+        )
+    except BaseException:
+        flight.failed = True
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+    return flight.result
@@ -0,0 +1,71 @@
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+import hashlib
+import os
+import posixpath
+import tempfile
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores a file under a name derived from the sha256 of its content:
+    <directory>/ab/cd/abcd...<extension>, where <directory> and <extension>
+    come from the requested name. The same content always gets the same name,
+    so a duplicate is never written again, and a file behind a URL never
+    changes, which lets the URL be cached forever.
+    """
+    hash_chunk_size = 64 * 1024
+
+    def get_digest(self, content: File) -> str:
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks(self.hash_chunk_size):
+            sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def get_content_name(self, name: str, digest: str) -> str:
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], f'{digest}{extension}'
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.get_content_name(name, self.get_digest(content))
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        """Writes the content into a temporary file and atomically moves it,
+        so concurrent uploads of the same content never see a partial file.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+
+        fd, temporary_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary_path, self.file_permissions_mode)
+            os.replace(temporary_path, full_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+        return name.replace('\\', '/')
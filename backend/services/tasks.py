@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.BACKGROUND_TASK_WORKERS,
+    thread_name_prefix='background-task'
+)
+
+
+def _run_task(func: Callable, *args, **kwargs) -> None:
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed.', func.__name__)
+    finally:
+        connection.close()
+
+
+def run_in_background(func: Callable, *args, **kwargs) -> None:
+    """Runs a function in a background thread, once the current transaction
+    is commited (immediately in autocommit mode), so the task sees
+    the written rows and does not hold up the response.
+    """
+    transaction.on_commit(
+        lambda: _executor.submit(_run_task, func, *args, **kwargs)
+    )
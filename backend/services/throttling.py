@@ -0,0 +1,168 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+THROTTLE_CACHE_KEY = 'throttle:{scope}:{ident}'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """Accepts a rate as '<number>/<period>', e.g. '10/min', and returns
+    a bucket capacity and its refill rate in tokens per second.
+    """
+    number, period = rate.split('/')
+    capacity = int(number)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def take_token(tokens: float,
+               updated_at: float,
+               now: float,
+               capacity: int,
+               refill_rate: float) -> Tuple[bool, float, float]:
+    """Refills a bucket for the time passed and takes a token from it.
+    Returns whether a token was taken, tokens left and seconds to wait
+    for the next token.
+    """
+    tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / refill_rate
+
+
+class LocalBucketStore:
+    """Keeps buckets in process memory, the least recently used ones
+    are evicted past <max_buckets>. Limits are enforced per process.
+    """
+    max_buckets = 100000
+
+    def __init__(self):
+        self.buckets: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self,
+                key: str,
+                capacity: int,
+                refill_rate: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated_at = self.buckets.pop(key, (capacity, now))
+            allowed, tokens, wait = take_token(
+                tokens, updated_at, now, capacity, refill_rate
+            )
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        return allowed, wait
+
+
+class CacheBucketStore:
+    """Keeps buckets in the shared cache, so limits hold across processes.
+    A bucket is read and written without a lock, so concurrent requests
+    may overdraw it by a token or two, which throttling tolerates.
+    """
+    def consume(self,
+                key: str,
+                capacity: int,
+                refill_rate: float) -> Tuple[bool, float]:
+        now = time.time()
+        tokens, updated_at = cache.get(key, (capacity, now))
+        allowed, tokens, wait = take_token(
+            tokens, updated_at, now, capacity, refill_rate
+        )
+        cache.set(key, (tokens, now), timeout=int(capacity / refill_rate) + 1)
+        return allowed, wait
+
+
+BUCKET_STORES = {
+    'local': LocalBucketStore,
+    'cache': CacheBucketStore,
+}
+_bucket_store = None
+
+
+def get_bucket_store():
+    """Returns a bucket store selected by THROTTLE_STORE setting."""
+    global _bucket_store
+    if _bucket_store is None:
+        _bucket_store = BUCKET_STORES[settings.THROTTLE_STORE]()
+    return _bucket_store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttles by token bucket: a client may spend a burst of <number>
+    requests at once, then one more per <period> / <number>. Rates are taken
+    from DEFAULT_THROTTLE_RATES by <scope>. The client is identified by
+    the authenticated user or the address, without database queries.
+    The address is taken from X-Forwarded-For as far as NUM_PROXIES trusts
+    it, so a client can not get a new bucket by changing the header.
+    """
+    scope: Optional[str] = None
+
+    def __init__(self):
+        self.retry_after: Optional[float] = None
+
+    def get_scope(self, request, view) -> Optional[str]:
+        return self.scope
+
+    def get_ident_key(self, request, view) -> Optional[str]:
+        if request.user and request.user.is_authenticated:
+            return f'user-{request.user.pk}'
+        return f'ip-{self.get_ident(request)}'
+
+    def allow_request(self, request, view) -> bool:
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+
+        allowed, self.retry_after = get_bucket_store().consume(
+            THROTTLE_CACHE_KEY.format(scope=scope, ident=ident),
+            *parse_rate(rate)
+        )
+        return allowed
+
+    def wait(self) -> Optional[float]:
+        return self.retry_after
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Limits all requests of an authenticated user."""
+    scope = 'user'
+
+    def get_ident_key(self, request, view) -> Optional[str]:
+        if request.user and request.user.is_authenticated:
+            return f'user-{request.user.pk}'
+        return None
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """Limits all anonymous requests from an address."""
+    scope = 'anon'
+
+    def get_ident_key(self, request, view) -> Optional[str]:
+        if request.user and request.user.is_authenticated:
+            return None
+        return f'ip-{self.get_ident(request)}'
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """Limits requests to views with <throttle_scope> attribute, optionally
+    only those of <throttle_methods>, by user or address.
+    """
+    def get_scope(self, request, view) -> Optional[str]:
+        methods = getattr(view, 'throttle_methods', None)
+        if methods is not None and request.method not in methods:
+            return None
+        return getattr(view, 'throttle_scope', None)
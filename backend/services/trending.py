@@ -0,0 +1,161 @@
+from recipes.models import RecipeActivity
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+import heapq
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+
+# Window name -> number of last days it covers, None for all time.
+TRENDING_WINDOWS = {'day': 1, 'week': 7, 'all': None}
+DEFAULT_TRENDING_WINDOW = 'week'
+# Number of the most popular recipes kept ranked per window.
+TRENDING_LIMIT = 1000
+# Windows are recounted from the daily counters this often, so they pick up
+# activity of other processes and move past expired days.
+TRENDING_TTL = 60 * 5
+
+
+def record_activity(recipe_id: int,
+                    favorites: int = 0,
+                    shopping_carts: int = 0,
+                    day: Optional[date] = None) -> None:
+    """Adds to today's counters of a recipe and applies the change to
+    the leaderboards. A removal is recorded with a negative number and is
+    taken from the latest day up to <day> (today by default), which has it
+    to take, i.e. the day the recipe was favorited or added to the cart.
+    So a counter never goes below zero, and removals of earlier additions
+    do not lower today's score.
+    """
+    changes = {
+        'favorites': F('favorites') + favorites,
+        'shopping_carts': F('shopping_carts') + shopping_carts,
+    }
+    if favorites < 0 or shopping_carts < 0:
+        remove_activity(recipe_id, favorites, shopping_carts, changes, day)
+        return
+
+    today = timezone.localdate()
+    activity = RecipeActivity.objects.filter(recipe_id=recipe_id, date=today)
+    if not activity.update(**changes):
+        try:
+            with transaction.atomic():
+                RecipeActivity.objects.create(
+                    recipe_id=recipe_id,
+                    date=today,
+                    favorites=favorites,
+                    shopping_carts=shopping_carts
+                )
+        except IntegrityError:
+            activity.update(**changes)
+    leaderboards.add_on_commit(recipe_id, favorites + shopping_carts, today)
+
+
+def remove_activity(recipe_id: int,
+                    favorites: int,
+                    shopping_carts: int,
+                    changes: dict,
+                    day: Optional[date]) -> None:
+    activities = RecipeActivity.objects.filter(
+        recipe_id=recipe_id,
+        date__lte=day or timezone.localdate(),
+        favorites__gte=-min(favorites, 0),
+        shopping_carts__gte=-min(shopping_carts, 0)
+    )
+    activity = activities.order_by('-date').values('id', 'date').first()
+    if activity is None:
+        return
+    # The counter is checked again, in case it was taken meanwhile.
+    if activities.filter(id=activity['id']).update(**changes):
+        leaderboards.add_on_commit(
+            recipe_id, favorites + shopping_carts, activity['date']
+        )
+
+
+class Leaderboards:
+    """Popularity of recipes per window of TRENDING_WINDOWS: scores of
+    the recipes with activity in the window and the top TRENDING_LIMIT of
+    them, ranked lazily after a change. Built from RecipeActivity on first
+    use, so the join tables of favorites and shopping carts are never
+    scanned, and rebuilt after TRENDING_TTL or when the day changes.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built_at: Optional[float] = None
+        self.built_on: Optional[date] = None
+        self.scores: Dict[str, Dict[int, int]] = {}
+        self.top: Dict[str, Optional[List[int]]] = {}
+
+    def build(self) -> None:
+        today = timezone.localdate()
+        for window, days in TRENDING_WINDOWS.items():
+            activity = RecipeActivity.objects.all()
+            if days is not None:
+                activity = activity.filter(
+                    date__gt=today - timedelta(days=days)
+                )
+            self.scores[window] = dict(
+                activity.values('recipe_id')
+                .annotate(score=Sum(F('favorites') + F('shopping_carts')))
+                .values_list('recipe_id', 'score')
+            )
+            self.top[window] = None
+        self.built_at = time.monotonic()
+        self.built_on = today
+
+    def ensure_built(self) -> None:
+        """Must be called under the lock."""
+        if (self.built_at is None
+                or time.monotonic() - self.built_at > TRENDING_TTL
+                or self.built_on != timezone.localdate()):
+            self.build()
+
+    def add(self, recipe_id: int, score: int, day: date) -> None:
+        """Applies activity of the day to the windows covering it.
+        Ignored until the leaderboards are built.
+        """
+        with self.lock:
+            if self.built_at is None:
+                return
+            for window, scores in self.scores.items():
+                days = TRENDING_WINDOWS[window]
+                if (days is not None
+                        and day <= self.built_on - timedelta(days=days)):
+                    continue
+                scores[recipe_id] = scores.get(recipe_id, 0) + score
+                self.top[window] = None
+
+    def add_on_commit(self, recipe_id: int, score: int, day: date) -> None:
+        """Applies activity once the transaction, which records it, commits,
+        so a rolled back change does not stay in the leaderboards.
+        """
+        transaction.on_commit(lambda: self.add(recipe_id, score, day))
+
+    def get_top(self, window: str) -> List[int]:
+        """Returns ids of the most popular recipes of the window, the most
+        popular first, ties broken by the newest.
+        """
+        with self.lock:
+            self.ensure_built()
+            if self.top[window] is None:
+                self.top[window] = [
+                    recipe_id
+                    for recipe_id, score in heapq.nlargest(
+                        TRENDING_LIMIT,
+                        self.scores[window].items(),
+                        key=lambda item: (item[1], item[0])
+                    ) if score > 0
+                ]
+            return self.top[window]
+
+
+leaderboards = Leaderboards()
+
+
+def get_trending_recipe_ids(window: str) -> List[int]:
+    return leaderboards.get_top(window)
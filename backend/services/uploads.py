@@ -0,0 +1,147 @@
+from recipes.models import Recipe
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+import io
+import tempfile
+from typing import BinaryIO, Optional, Tuple
+
+from PIL import Image
+
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_ID_SALT = 'services.uploads.image'
+# An upload id has to be used in a recipe within this time.
+UPLOAD_ID_MAX_AGE = 60 * 60 * 24
+
+# Leading bytes of the accepted image formats and their file extensions.
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+)
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'The uploaded file is too large.'
+    default_code = 'payload_too_large'
+
+
+class LengthRequired(APIException):
+    status_code = status.HTTP_411_LENGTH_REQUIRED
+    default_detail = 'Content-Length header is required.'
+    default_code = 'length_required'
+
+
+def get_image_extension(head: bytes) -> Optional[str]:
+    """Detects an image format by the first bytes of a file."""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def verify_image(file: BinaryIO) -> None:
+    """Checks with Pillow, that the file is a whole image."""
+    try:
+        with Image.open(file) as image:
+            image.verify()
+    except Exception:
+        raise ValidationError('The uploaded file is not a valid image.')
+
+
+def get_image_content_extension(content: bytes) -> str:
+    """Returns the extension of an image by its content, which has to be
+    a valid image of one of the accepted formats.
+    """
+    extension = get_image_extension(content[:UPLOAD_CHUNK_SIZE])
+    if extension is None:
+        raise ValidationError(
+            'Only PNG, JPEG, GIF and WebP images are accepted.'
+        )
+    verify_image(io.BytesIO(content))
+    return extension
+
+
+def receive_image(stream: BinaryIO,
+                  content_length: int) -> Tuple[BinaryIO, str]:
+    """Copies a raw image body into a temporary file by chunks, so only
+    a chunk of it is in memory at a time. The size is limited by
+    IMAGE_UPLOAD_MAX_SIZE, the format by the first bytes and by Pillow.
+    Returns the file and its extension.
+    """
+    if content_length > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise PayloadTooLarge()
+
+    file = tempfile.TemporaryFile()
+    try:
+        head = stream.read(UPLOAD_CHUNK_SIZE)
+        extension = get_image_extension(head)
+        if extension is None:
+            raise ValidationError(
+                'Only PNG, JPEG, GIF and WebP images are accepted.'
+            )
+
+        size = 0
+        chunk = head
+        while chunk:
+            size += len(chunk)
+            if size > settings.IMAGE_UPLOAD_MAX_SIZE:
+                raise PayloadTooLarge()
+            file.write(chunk)
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+
+        file.seek(0)
+        verify_image(file)
+        file.seek(0)
+        return file, extension
+    except BaseException:
+        file.close()
+        raise
+
+
+def store_image_upload(stream: BinaryIO,
+                       content_length: int,
+                       user_id: int) -> Tuple[str, str]:
+    """Stores a streamed image with the storage of recipe images and
+    returns a signed upload id, which the user can use as the image of
+    a recipe, along with the stored name.
+    """
+    file, extension = receive_image(stream, content_length)
+    with file:
+        field = Recipe._meta.get_field('image')
+        name = field.storage.save(
+            field.generate_filename(None, f'image{extension}'),
+            File(file)
+        )
+    upload_id = signing.dumps(
+        {'name': name, 'user': user_id},
+        salt=UPLOAD_ID_SALT,
+        compress=True
+    )
+    return upload_id, name
+
+
+def get_uploaded_image_name(upload_id: str,
+                            user_id: Optional[int]) -> Optional[str]:
+    """Returns the stored name of an image upload, if the upload id
+    is valid, not expired and was issued to the user.
+    """
+    try:
+        upload = signing.loads(
+            upload_id, salt=UPLOAD_ID_SALT, max_age=UPLOAD_ID_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    if upload.get('user') != user_id:
+        return None
+    return upload.get('name')
@@ -1,8 +1,19 @@
+from services.authentication import (
+    is_stateless_mode,
+    issue_tokens,
+    refresh_access_token,
+    revoke_session,
+)
+from services.routers import pin_token_to_primary
 from services.serializers import CustomAuthTokenSerializer
 
+from rest_framework import serializers, views
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 
 class CustomAuthTokenView(ObtainAuthToken):
@@ -10,6 +21,16 @@ class CustomAuthTokenView(ObtainAuthToken):
     in order to do authentication by email, not username.
     """
     serializer_class = CustomAuthTokenSerializer
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'login'
+
+    def get_authenticators(self):
+        """Login ignores the credentials of the request, which may be
+        an expired access token.
+        """
+        if 'login/' in self.request.path:
+            return []
+        return super().get_authenticators()
 
     def post(self, request, *args, **kwargs):
         if 'login/' in request.path:
@@ -19,9 +40,15 @@ class CustomAuthTokenView(ObtainAuthToken):
             )
             serializer.is_valid(raise_exception=True)
 
-            token, _ = Token.objects.get_or_create(
+            if is_stateless_mode():
+                return Response(
+                    data=issue_tokens(serializer.validated_data['user'])
+                )
+            token, created = Token.objects.get_or_create(
                 user=serializer.validated_data['user']
             )
+            if created:
+                pin_token_to_primary(token.key)
             return Response(data={'auth_token': token.key})
 
         if not request.user.is_authenticated:
@@ -32,7 +59,10 @@ class CustomAuthTokenView(ObtainAuthToken):
                 }
             )
 
-        request.user.auth_token.delete()
+        if isinstance(request.auth, Token):
+            request.auth.delete()
+        else:
+            revoke_session(request.auth)
 
         return Response(
             data={
@@ -40,3 +70,26 @@ class CustomAuthTokenView(ObtainAuthToken):
                 'message': 'Authentication token was sucessfully deleted.'
             }
         )
+
+
+class RefreshTokenView(views.APIView):
+    """Issues a new access token by a refresh token in the stateless token
+    mode (AUTH_TOKEN_MODE = 'jwt').
+    """
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'login'
+
+    def get_authenticate_header(self, request):
+        return 'Bearer'
+
+    def post(self, request):
+        if not is_stateless_mode():
+            raise NotFound('Token refresh is not enabled.')
+        refresh = request.data.get('refresh')
+        if not isinstance(refresh, str) or not refresh:
+            raise serializers.ValidationError(
+                {'refresh': 'This field is required.'}
+            )
+        return Response(data={'auth_token': refresh_access_token(refresh)})
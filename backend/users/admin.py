@@ -1,23 +1,57 @@
-from users.models import User, UserCart, UserSubscription, UserRecipe
+from users.models import (
+    User,
+    UserCart,
+    UserCartRecipe,
+    UserRecipe,
+    UserSubscription,
+)
+from services.pagination import EstimatedCountPaginator
 
 from django.contrib import admin
 
 
 class UserAdmin(admin.ModelAdmin):
     search_fields = ('email',)
-    list_filter = ('email', 'username')
+    # Filtering by email or username would list every user in the sidebar.
+    list_filter = ('is_staff', 'is_active')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class UserCartRecipeInline(admin.TabularInline):
+    model = UserCartRecipe
+    autocomplete_fields = ('recipe',)
+    readonly_fields = ('added_date',)
+
+    extra = 1
 
 
 class UserCartAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user')
+    list_select_related = ('user',)
     search_fields = ('user__email',)
+    autocomplete_fields = ('user',)
+    inlines = (UserCartRecipeInline,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class UserSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'follower', 'author', 'subscription_date')
+    list_select_related = ('follower', 'author')
     search_fields = ('author__email',)
+    autocomplete_fields = ('follower', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class UserRecipeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'recipe', 'note')
+    list_select_related = ('user', 'recipe')
     search_fields = ('user__email',)
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.empty_value_display = '---empty---'
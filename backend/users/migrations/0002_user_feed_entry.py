@@ -0,0 +1,37 @@
+# Generated by Django 3.2.7 on 2026-10-19 12:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='автор')),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='подписчик')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe', verbose_name='рецепт')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'записи ленты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='userfeedentry',
+            index=models.Index(fields=['follower', 'author'], name='user_feed_entry_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='userfeedentry',
+            constraint=models.UniqueConstraint(fields=('follower_id', 'recipe_id'), name='user_feed_entry_unique_constraint'),
+        ),
+    ]
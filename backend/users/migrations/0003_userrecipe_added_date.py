@@ -0,0 +1,20 @@
+# Generated by Django 3.2.7 on 2026-10-19 13:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_feed_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userrecipe',
+            name='added_date',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='дата добавления'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+# The implicit through table of <UserCart.recipes> becomes the UserCartRecipe
+# model, keeping the table and its rows, and gets <added_date>.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+        ('users', '0003_userrecipe_added_date'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='UserCartRecipe',
+                    fields=[
+                        ('id', models.AutoField(primary_key=True, serialize=False)),
+                        ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe', verbose_name='рецепт')),
+                        ('usercart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.usercart', verbose_name='карзина покупок')),
+                    ],
+                    options={
+                        'verbose_name': 'рецепт в карзине покупок',
+                        'verbose_name_plural': 'рецепты в карзинах покупок',
+                        'db_table': 'users_usercart_recipes',
+                        'unique_together': {('usercart', 'recipe')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='usercart',
+                    name='recipes',
+                    field=models.ManyToManyField(through='users.UserCartRecipe', to='recipes.Recipe', verbose_name='рецепт'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='usercartrecipe',
+            name='added_date',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='дата добавления'),
+            preserve_default=False,
+        ),
+    ]
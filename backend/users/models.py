@@ -59,6 +59,7 @@ class UserCart(models.Model):
 
     recipes = models.ManyToManyField(
         to='recipes.Recipe',
+        through='UserCartRecipe',
         verbose_name='рецепт',
     )
 
@@ -75,6 +76,41 @@ class UserCart(models.Model):
         return f'Карзина - id: {self.id}, владелец: {self.user}.'
 
 
+class UserCartRecipe(models.Model):
+    """Intermediate "join" table of user's shopping cart and recipes.
+    Additionaly implements <added_date> field.
+    """
+    # The table was created for the implicit through model of
+    # <UserCart.recipes>, which has an integer primary key.
+    id = models.AutoField(primary_key=True)
+
+    usercart = models.ForeignKey(
+        to='UserCart',
+        on_delete=models.CASCADE,
+        verbose_name='карзина покупок',
+    )
+
+    recipe = models.ForeignKey(
+        to='recipes.Recipe',
+        on_delete=models.CASCADE,
+        verbose_name='рецепт',
+    )
+
+    added_date = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='дата добавления',
+    )
+
+    class Meta:
+        db_table = 'users_usercart_recipes'
+        unique_together = ('usercart', 'recipe')
+        verbose_name = 'рецепт в карзине покупок'
+        verbose_name_plural = 'рецепты в карзинах покупок'
+
+    def __str__(self):
+        return f'КарзинаРецепт - id: {self.id}.'
+
+
 class UserSubscription(models.Model):
     """Intermediate "join" table of subscription between two users.
     """
@@ -129,9 +165,61 @@ class UserRecipe(models.Model):
         verbose_name='примечание',
     )
 
+    added_date = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='дата добавления',
+    )
+
     class Meta:
         verbose_name = 'отношение пользователя к рецепту'
         verbose_name_plural = 'отношение пользователей к рецептам'
 
     def __str__(self):
         return f'ПользовательРецепт - id: {self.id}.'
+
+
+class UserFeedEntry(models.Model):
+    """Precomputed timeline of a follower: one entry per recipe published
+    by an author the follower is subscribed on. Entries are written on recipe
+    creation (fan-out), so a feed page is read by keyset on <recipe_id>.
+    """
+    follower = models.ForeignKey(
+        to='User',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='подписчик',
+    )
+
+    author = models.ForeignKey(
+        to='User',
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='автор',
+    )
+
+    recipe = models.ForeignKey(
+        to='recipes.Recipe',
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='рецепт',
+    )
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'записи ленты'
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=('follower_id', 'recipe_id'),
+                name='user_feed_entry_unique_constraint'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('follower', 'author'),
+                name='user_feed_entry_author_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'ЗаписьЛенты - id: {self.id}.'
@@ -1,5 +1,6 @@
 from .models import UserSubscription
 from recipes.models import Recipe
+from services.fieldsets import SparseFieldsetMixin
 from services.functions import (
     is_subscribed,
 
@@ -30,20 +31,18 @@ from rest_framework.request import Request
 User = get_user_model()
 
 
-class GETUserSerializer(serializers.ModelSerializer):
-    def to_representation(self, user: User) -> dict:
-        return {
-            'id': user.id,
-            'username': user.username,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'email': user.email,
+class GETUserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    representation_fields = (
+        'id',
+        'username',
+        'first_name',
+        'last_name',
+        'email',
+        'is_subscribed',
+    )
 
-            'is_subscribed': is_subscribed(
-                user=user,
-                request=self.context['request']
-            )
-        }
+    def get_is_subscribed(self, user: User) -> bool:
+        return is_subscribed(user=user, request=self.context.get('request'))
 
     class Meta:
         model = User
@@ -102,28 +101,34 @@ class NestedUserRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
-class UserSubscriptionSerializer(serializers.ModelSerializer):
-    def to_representation(self, user: User):
+class UserSubscriptionSerializer(SparseFieldsetMixin,
+                                 serializers.ModelSerializer):
+    representation_fields = (
+        'id',
+        'username',
+        'email',
+        'first_name',
+        'last_name',
+        'recipes',
+        'recipes_count',
+        'is_subscribed',
+    )
+
+    def get_recipes(self, user: User) -> list:
         recipes_limit = self.context['request'].query_params.get(
             'recipes_limit'
         )
+        return NestedUserRecipeSerializer(
+            user.recipes.all()[:int(recipes_limit)] if recipes_limit \
+                else user.recipes.all(),
+            many=True
+        ).data
 
-        return {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-
-            'recipes': NestedUserRecipeSerializer(
-                user.recipes.all()[:int(recipes_limit)] if recipes_limit \
-                    else user.recipes.all(),
-                many=True
-            ).data,
+    def get_recipes_count(self, user: User) -> int:
+        return user.recipes.all().count()
 
-            'recipes_count': user.recipes.all().count(),
-            'is_subscribed': True,
-        }
+    def get_is_subscribed(self, user: User) -> bool:
+        return True
 
     def validate(self, request: Request, id: int) -> dict:
         validate_subscription(request=request, id=id)
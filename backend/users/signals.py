@@ -0,0 +1,18 @@
+from .models import User
+from services.rows import AUTHOR_FIELDS, invalidate_recipe_representations
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(sender, instance, created, update_fields,
+                              **kwargs):
+    """Cached recipe representations embed the author profile, saves of
+    other fields only, e.g. <last_login> on login, keep them.
+    """
+    if created or (update_fields and update_fields.isdisjoint(AUTHOR_FIELDS)):
+        return
+    invalidate_recipe_representations(
+        instance.recipes.values_list('id', 'creation_date')
+    )
\ No newline at end of file
@@ -1,5 +1,5 @@
 from . import views
-from services.views import CustomAuthTokenView
+from services.views import CustomAuthTokenView, RefreshTokenView
 
 from django.urls import path
 
@@ -17,6 +17,11 @@ urlpatterns = [
         CustomAuthTokenView.as_view(),
         name='custom_logout_view'
     ),
+    path(
+        'auth/token/refresh/',
+        RefreshTokenView.as_view(),
+        name='refresh_token_view'
+    ),
     path(
         'users/me/',
         views.UserDetailView.as_view(),
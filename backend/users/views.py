@@ -36,6 +36,7 @@ class UserDetailView(generics.RetrieveAPIView):
 class UserPasswordView(generics.CreateAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = UserPasswordSerializer
+    throttle_scope = 'set_password'
 
     def post(self, request):
         serializer = self.get_serializer(data=request.data)